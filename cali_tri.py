@@ -3,6 +3,11 @@
 import serial
 import time
 
+from calibration import DEGREES_PER_PIVOT_TURN
+from command_timing import load_durations
+from sequence_optimizer import optimize_sequence
+from transport import BittleTransport
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -11,7 +16,7 @@ BAUD_RATE = 115200
 # From your testing, we now know these are the basic building blocks for our shapes.
 WALK_FORWARD = b'kwkF\n'
 # You discovered that 2 pivot turns make a 90-degree corner!
-TURN_90_DEGREES = [b'kvtL\n', b'kvtL\n']
+TURN_90_DEGREES = [b'kvtL\n'] * round(90 / DEGREES_PER_PIVOT_TURN)
 
 # --- Shape Sequences ---
 # We build our shapes using the calibrated actions above.
@@ -26,8 +31,8 @@ for _ in range(4): # Repeat 4 times for 4 sides
 # Calculation: If 2 turns = 90 deg, then 1 turn = 45 deg.
 # - Turn at 40-deg corner (140 deg external) = 140/45 = ~3 turns
 # - Turn at 70-deg corner (110 deg external) = 110/45 = ~2 turns
-TURN_140_DEGREES = [b'kvtL\n'] * 3
-TURN_110_DEGREES = [b'kvtL\n'] * 2
+TURN_140_DEGREES = [b'kvtL\n'] * round(140 / DEGREES_PER_PIVOT_TURN)
+TURN_110_DEGREES = [b'kvtL\n'] * round(110 / DEGREES_PER_PIVOT_TURN)
 
 TRIANGLE_SEQUENCE = [
     WALK_FORWARD, # Side A
@@ -68,30 +73,31 @@ def main():
     # shape_name = "TRIANGLE"
     # ==========================================================
 
+    durations = load_durations()
+    transport = BittleTransport(bittle_serial)
+
     try:
         print("Bittle standing by...")
-        bittle_serial.write(b'kbalance\n')
-        time.sleep(2)
+        transport.send(b'kbalance\n', durations.duration(b'kbalance\n'))
 
-        print(f"Executing {shape_name} sequence ({len(sequence_to_run)} steps)...")
+        # Merge repeated turns into continuous gaits before sending
+        steps, saved = optimize_sequence(sequence_to_run, durations)
+        print(f"Executing {shape_name} sequence ({len(steps)} steps, {saved:.1f}s faster than step by step)...")
+        print("Press Ctrl+C to stop the robot immediately.")
         
-        for i, command in enumerate(sequence_to_run):
-            print(f"--> Sending step {i+1}: {command.decode().strip()}")
-            bittle_serial.write(command)
-            
-            if command == WALK_FORWARD:
-                time.sleep(2.5)
-            else: # It's a turn command
-                time.sleep(1.5)
+        for i, (command, seconds) in enumerate(steps):
+            print(f"--> Queued step {i+1}: {command.decode().strip()} for {seconds:.1f}s")
+        transport.send_steps(steps)
+        transport.wait_idle()
         
         print(f"\n--- {shape_name} Complete! ---")
         
     finally:
+        # Rest jumps ahead of anything still queued (e.g. after Ctrl+C)
         print("Shutting down...")
-        if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(b'd\n')
-            bittle_serial.close()
-            print("Serial port closed.")
+        if bittle_serial.is_open:
+            transport.close(b'd\n')
+            print(f"Rest sent in {transport.stop_latencies[-1] * 1000:.1f} ms. Serial port closed.")
 
 if __name__ == "__main__":
     main()
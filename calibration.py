@@ -0,0 +1,30 @@
+# calibration.py
+# Measured motion of the Bittle skills, shared by the shape drawers and path compilers.
+
+# --- Turn Calibration ---
+# From cali_tri: 2 pivot turns (kvtL) make a 90-degree corner, so 1 pivot turn = 45 degrees.
+DEGREES_PER_PIVOT_TURN = 45
+
+# --- Stride Calibration ---
+# How far one kwkF send carries the robot, in centimeters.
+# Measure this on your floor and update it; paths are scaled to it when compiling.
+WALK_STRIDE_CM = 10.0
+
+# --- Command Motion Table ---
+# For one send of each skill: heading change in degrees (counter-clockwise is positive),
+# forward travel in centimeters, and seconds until the robot is ready for the next command.
+# Walk and pivot timings are the ones cali_tri waits; the trot turns are estimates
+# (shape_Bittle_test needs three ktrL for a corner), so measure them before relying on them.
+COMMAND_MOTION = {
+    b'kwkF\n': (0, WALK_STRIDE_CM, 2.5),
+    b'kbkF\n': (0, -WALK_STRIDE_CM, 2.5),
+    b'kvtL\n': (DEGREES_PER_PIVOT_TURN, 0, 1.5),
+    b'kvtR\n': (-DEGREES_PER_PIVOT_TURN, 0, 1.5),
+    b'ktrL\n': (30, 3.0, 2.0),
+    b'ktrR\n': (-30, 3.0, 2.0),
+}
+
+# The entries actually measured with cali_tri. Planners use only these unless told
+# to trust the estimates too.
+MEASURED_COMMANDS = (b'kwkF\n', b'kvtL\n', b'kvtR\n')
+MEASURED_MOTION = {command: COMMAND_MOTION[command] for command in MEASURED_COMMANDS}
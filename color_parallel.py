@@ -0,0 +1,68 @@
+# color_parallel.py
+# Color-card classification spread over CPU cores. The frame is cut into horizontal
+# stripes and each stripe is converted to HSV and masked in a worker thread (OpenCV
+# releases the GIL), writing straight into full-frame buffers. Contours are then found
+# on the whole masks, one color per worker, so a card lying across a stripe boundary is
+# still one blob with its real area - the result is the same as the single-threaded code.
+#
+#   classifier = StripeClassifier({"red": [(lower_1, upper_1), (lower_2, upper_2)], "blue": [(lower, upper)]})
+#   areas = classifier.largest_areas(frame)  # {"red": 1234.0, "blue": 0.0}
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from frame_buffers import FrameBuffers
+
+MIN_STRIPE_ROWS = 32  # Thinner stripes cost more in task overhead than they save
+
+
+class StripeClassifier:
+    """Largest blob area per color, with masking and contour finding run in a thread pool."""
+
+    def __init__(self, colors, workers=None):
+        """colors maps a name to a list of (lower, upper) HSV ranges whose masks are OR-ed together."""
+        self.colors = colors
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="color-stripe")
+        self.buffers = FrameBuffers()
+
+    def _mask_stripe(self, frame, top, bottom):
+        hsv = self.buffers.get("hsv", frame.shape)[top:bottom]
+        cv2.cvtColor(frame[top:bottom], cv2.COLOR_BGR2HSV, dst=hsv)
+        mask_shape = frame.shape[:2]
+        for name, ranges in self.colors.items():
+            mask = self.buffers.get(name, mask_shape)[top:bottom]
+            cv2.inRange(hsv, ranges[0][0], ranges[0][1], dst=mask)
+            for lower, upper in ranges[1:]:
+                extra = self.buffers.get((name, "extra"), mask_shape)[top:bottom]
+                cv2.inRange(hsv, lower, upper, dst=extra)
+                cv2.bitwise_or(mask, extra, dst=mask)
+
+    def _largest_area(self, name):
+        contours, _ = cv2.findContours(self.buffers.get(name, self.shape), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return max((cv2.contourArea(contour) for contour in contours), default=0.0)
+
+    def masks(self, frame):
+        """Fills the HSV image and one mask per color, stripe by stripe. Returns {name: mask}."""
+        self.shape = frame.shape[:2]
+        # Allocate up front: workers must only ever write into existing buffers
+        self.buffers.get("hsv", frame.shape)
+        for name, ranges in self.colors.items():
+            self.buffers.get(name, self.shape)
+            if len(ranges) > 1:
+                self.buffers.get((name, "extra"), self.shape)
+
+        rows = frame.shape[0]
+        stripes = max(1, min(self.workers, rows // MIN_STRIPE_ROWS))
+        bounds = [rows * i // stripes for i in range(stripes + 1)]
+        list(self.executor.map(lambda i: self._mask_stripe(frame, bounds[i], bounds[i + 1]), range(stripes)))
+        return {name: self.buffers.get(name, self.shape) for name in self.colors}
+
+    def largest_areas(self, frame):
+        """{color: area of its largest blob} for a BGR frame."""
+        self.masks(frame)
+        return dict(zip(self.colors, self.executor.map(self._largest_area, self.colors)))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,184 @@
+# command_timing.py
+# Measures how long each Bittle skill really takes and keeps the numbers in a table
+# that every executor sleeps by, instead of each script guessing its own delay.
+#
+# Measure on the robot (the firmware echoes each command once it has finished it):
+#   python command_timing.py --port /dev/tty.BittleB3_SSP kbalance krest
+# Gaits never finish by themselves; for them the echo marks the gait getting going, and
+# the calibrated walking time is added on top (measured the same way, by name):
+#   python command_timing.py --port /dev/tty.BittleB3_SSP kwkF kvtL kvtR
+# Durations timed by hand can be stored directly:
+#   python command_timing.py --set kwkF=2.5 kvtL=1.5
+import argparse
+import json
+import os
+import time
+
+from calibration import COMMAND_MOTION
+
+# --- Timing Configuration ---
+DURATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'command_durations.json')
+SAFETY_MARGIN = 0.1  # Seconds added on top of the slowest measured run
+FALLBACK_DURATION = 2.0  # For commands that have never been measured or calibrated
+# Part of each send spent getting a gait going from stance and settling again.
+# A gait left running pays it once, not once per cycle.
+GAIT_STARTUP_SECONDS = 0.5
+
+# Until a command is measured we fall back to the calibrated motion table,
+# and to the waits the scripts used for the stance commands, unless the
+# executor had its own fixed wait (see EXECUTOR_WAITS).
+DEFAULT_DURATIONS = {command: motion[2] for command, motion in COMMAND_MOTION.items()}
+DEFAULT_DURATIONS.update({
+    b'kbalance\n': 2.0,
+    b'd\n': 1.0,
+    b'krest\n': 1.0,
+})
+
+
+# The fixed wait each executor slept after every command before there was a duration
+# table. An executor listed here keeps that wait for any command not yet measured, so
+# its timing only changes once real numbers exist. (cali_tri already waited by the
+# calibrated motion table, so it isn't listed.)
+EXECUTOR_WAITS = {
+    "life_driver": 0.5,
+    "test121": 2.0,
+    "triangle_test": 2.0,
+    "shape_Bittle_test": 2.0,
+    "sequential_test": 3.0,
+}
+
+
+def _token(command):
+    return command.decode().strip()
+
+def _command(token):
+    return (token.strip() + '\n').encode()
+
+class DurationTable:
+    """Seconds each command needs before the robot is ready for the next one."""
+
+    def __init__(self, path=DURATIONS_FILE, default=None):
+        self.path = path
+        self.default = default  # Seconds for any unmeasured command; the tables above when None
+        self.measured = {}
+
+    def duration(self, command):
+        if command in self.measured:
+            return self.measured[command]
+        if self.default is not None:
+            return self.default
+        return DEFAULT_DURATIONS.get(command, FALLBACK_DURATION)
+
+    def repeat_duration(self, command):
+        """Seconds each extra cycle adds when a gait keeps running instead of being re-sent."""
+        seconds = self.duration(command)
+        return max(seconds - GAIT_STARTUP_SECONDS, seconds / 2)
+
+    def with_default(self, default):
+        """The same measurements, with another wait for unmeasured commands."""
+        table = DurationTable(self.path, default)
+        table.measured = self.measured
+        return table
+
+    def total(self, sequence):
+        return sum(self.duration(command) for command in sequence)
+
+    def record(self, command, samples, margin=SAFETY_MARGIN):
+        """Stores the tightest safe time for a command: its slowest sample plus a margin."""
+        self.measured[command] = round(max(samples) + margin, 3)
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.measured = {_command(token): seconds for token, seconds in json.load(f).items()}
+        return self
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({_token(command): seconds for command, seconds in sorted(self.measured.items())}, f, indent=2)
+
+def load_durations(path=DURATIONS_FILE, executor=None):
+    """
+    The duration table executors schedule from, with any saved measurements applied.
+    Executors pass their name to keep their old wait (EXECUTOR_WAITS) for unmeasured commands.
+    """
+    return DurationTable(path, EXECUTOR_WAITS.get(executor)).load()
+
+def measure_command(ser, command, repeats=3, timeout=10.0):
+    """
+    Sends a command `repeats` times and times how long the firmware takes to echo it
+    back, which it does once the skill has finished. Other output is skipped.
+    Returns the list of measured seconds (timeouts are left out).
+    """
+    token = _token(command)
+    samples = []
+    for _ in range(repeats):
+        ser.reset_input_buffer()
+        start = time.monotonic()
+        ser.write(command)
+        while time.monotonic() - start < timeout:
+            line = ser.readline().decode(errors='replace').strip()
+            if line == token:
+                samples.append(time.monotonic() - start)
+                break
+        else:
+            print(f"  No echo of {token} within {timeout}s")
+    return samples
+
+def measure_gait(ser, command, repeats=3, timeout=10.0):
+    """
+    Times a gait: the firmware echoes a gait once it has started it, so the echo gives
+    the startup, and the calibrated walking time (the stride the planner assumes) is
+    added on top. The robot is brought back to balance between runs.
+    Returns the list of measured seconds (timeouts are left out).
+    """
+    walking = COMMAND_MOTION[command][2] - GAIT_STARTUP_SECONDS
+    samples = []
+    for _ in range(repeats):
+        startup = measure_command(ser, command, 1, timeout)
+        measure_command(ser, b'kbalance\n', 1, timeout)
+        samples.extend(seconds + walking for seconds in startup)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Bittle command durations.")
+    parser.add_argument("tokens", nargs="*", help="skill tokens to measure, e.g. kbalance krest")
+    parser.add_argument("--port", default='/dev/tty.BittleB3_SSP')
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--set", nargs="+", default=[], metavar="TOKEN=SECONDS",
+                        help="store durations timed by hand, e.g. for gaits")
+    args = parser.parse_args()
+
+    table = load_durations()
+    for item in args.set:
+        token, _, seconds = item.partition('=')
+        table.record(_command(token), [float(seconds)], margin=0)
+
+    commands = [_command(token) for token in args.tokens]
+    if commands:
+        import serial
+
+        try:
+            ser = serial.Serial(args.port, 115200, timeout=0.1)
+        except serial.SerialException as e:
+            print(f"Error: Could not connect to {args.port}. Details: {e}")
+            return
+        time.sleep(2)
+        try:
+            for command in commands:
+                print(f"Measuring {_token(command)}...")
+                # A gait runs until the next command, so only its startup is echoed
+                measure = measure_gait if command in COMMAND_MOTION else measure_command
+                samples = measure(ser, command, args.repeats)
+                if samples:
+                    table.record(command, samples)
+                    print(f"  samples {[round(s, 2) for s in samples]} -> {table.duration(command):.2f}s")
+        finally:
+            ser.write(b'd\n')
+            ser.close()
+
+    table.save()
+    print(f"Saved {len(table.measured)} durations to {table.path}")
+
+if __name__ == "__main__":
+    main()
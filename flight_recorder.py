@@ -0,0 +1,154 @@
+# flight_recorder.py
+# Always-on record of the last few seconds a vision loop saw and decided, so a wrong
+# command or a false detection can be looked at afterwards. Frames are shrunk into a
+# preallocated ring together with the label of each decision; nothing is written to
+# disk until a dump is asked for (a key press, an exception or a trigger condition).
+#
+#   recorder = FlightRecorder()
+#   recorder.record(frame, color="red", command="kwkF")   # every frame
+#   recorder.dump("manual")                               # writes flights/flight_<time>_manual.npz
+#
+#   python flight_recorder.py flights/flight_20250101_120000_manual.npz --show
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+FLIGHTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flights')
+FLIGHT_SECONDS = 10  # How much history is kept
+FLIGHT_FPS = 30  # Expected camera rate, used to size the ring
+FLIGHT_FRAME_SIZE = (160, 120)  # Width, height of the stored frames
+FIELDS = ("decision", "color", "shape", "confidence", "command")
+DUMP_KEY = ord('f')  # The key the loops use to dump on demand
+TRIGGER_COOLDOWN = 10.0  # Seconds between dumps from the same trigger
+
+
+class FlightRecorder:
+    """Ring of the last seconds * fps downscaled frames and the labels decided for them."""
+
+    def __init__(self, seconds=FLIGHT_SECONDS, fps=FLIGHT_FPS, size=FLIGHT_FRAME_SIZE, name="flight"):
+        self.name = name
+        self.capacity = int(seconds * fps)
+        self.size = size
+        width, height = size
+        self.frames = np.zeros((self.capacity, height, width, 3), dtype=np.uint8)
+        self.times = np.zeros(self.capacity)
+        self.codes = np.zeros((self.capacity, len(FIELDS)), dtype=np.int16)
+        # Labels are stored as indices into this table, so recording a frame allocates nothing
+        self.labels = [""]
+        self._label_codes = {"": 0}
+        self.count = 0
+        self.source_shape = None
+        self._last_trigger = {}
+
+    def _code(self, label):
+        label = "" if label is None else str(label)
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def record(self, frame, when=None, **fields):
+        """Stores a shrunk copy of the frame with its labels (decision, color, shape, confidence, command)."""
+        slot = self.count % self.capacity
+        cv2.resize(frame, self.size, dst=self.frames[slot], interpolation=cv2.INTER_AREA)
+        self.times[slot] = time.time() if when is None else when
+        codes = self.codes[slot]
+        for i, field in enumerate(FIELDS):
+            codes[i] = self._code(fields.get(field))
+        self.source_shape = frame.shape
+        self.count += 1
+
+    def label(self, field, value):
+        """Changes a label of the newest frame, for decisions made after it was recorded."""
+        if self.count:
+            self.codes[(self.count - 1) % self.capacity, FIELDS.index(field)] = self._code(value)
+
+    def dump(self, reason="manual", directory=FLIGHTS_DIR):
+        """
+        Writes the ring, oldest frame first, to a compressed .npz and returns its path.
+        The copy is taken here; compressing and writing happen on a background thread.
+        """
+        kept = min(self.count, self.capacity)
+        order = np.arange(self.count - kept, self.count) % self.capacity
+        path = os.path.join(directory, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}_{reason}.npz")
+        data = {
+            "frames": self.frames[order],
+            "times": self.times[order],
+            "codes": self.codes[order],
+            "labels": np.array(self.labels),
+            "fields": np.array(FIELDS),
+            "source_shape": np.array(self.source_shape or (0, 0, 3)),
+            "reason": np.array(reason),
+        }
+
+        def write():
+            os.makedirs(directory, exist_ok=True)
+            np.savez_compressed(path, **data)
+
+        threading.Thread(target=write, name="flight-dump").start()
+        print(f"Flight recorder: dumping {kept} frames to {path}")
+        return path
+
+    def trigger(self, reason, cooldown=TRIGGER_COOLDOWN):
+        """Dumps for a trigger condition, at most once per cooldown for the same reason."""
+        now = time.monotonic()
+        if now - self._last_trigger.get(reason, -cooldown) < cooldown:
+            return None
+        self._last_trigger[reason] = now
+        return self.dump(reason)
+
+def load_flight(path):
+    """Reads a dump back as (frames, times, [{field: label}], source_shape, reason)."""
+    with np.load(path) as data:
+        labels = data["labels"].tolist()
+        fields = data["fields"].tolist()
+        records = [{field: labels[code] for field, code in zip(fields, row)} for row in data["codes"]]
+        return data["frames"], data["times"], records, tuple(data["source_shape"]), str(data["reason"])
+
+def replay(path, show=False):
+    """Runs the offline detectors over a dump and prints what they see next to what was recorded."""
+    from perception import Perception, color_card, house, shape_trigger
+
+    frames, times, records, source_shape, reason = load_flight(path)
+    print(f"{path}: {len(frames)} frames over {times[-1] - times[0] if len(times) else 0:.1f}s, dumped for '{reason}'")
+
+    perception = Perception()
+    perception.register("color", color_card)
+    perception.register("shape", shape_trigger)
+    perception.register("house", house)
+    height, width = source_shape[:2] if source_shape[0] else frames.shape[1:3]
+    for i, (small, when, record) in enumerate(zip(frames, times, records)):
+        # Back to the camera's resolution so area thresholds mean what they did live
+        frame = cv2.resize(small, (int(width), int(height)), interpolation=cv2.INTER_LINEAR)
+        results = perception.process(frame)
+        seen = {
+            "color": results["color"],
+            "shape": results["shape"][0] if results["shape"] else None,
+            "house": results["house"][0] if results["house"] else None,
+        }
+        recorded = {field: label for field, label in record.items() if label}
+        print(f"  {i:4d} t={when - times[0]:6.2f}s recorded {recorded} replayed {seen}")
+        if show:
+            cv2.putText(frame, str(recorded), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(frame, str(seen), (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            cv2.imshow("Flight Replay", frame)
+            if cv2.waitKey(0 if show == "step" else 33) & 0xFF == ord('q'):
+                break
+    if show:
+        cv2.destroyAllWindows()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a flight recorder dump through the detectors.")
+    parser.add_argument("dump", help=".npz written by FlightRecorder.dump")
+    parser.add_argument("--show", action="store_true", help="play the frames in a window")
+    parser.add_argument("--step", action="store_true", help="with --show, wait for a key on every frame")
+    args = parser.parse_args()
+    replay(args.dump, show="step" if args.step else args.show)
+
+if __name__ == "__main__":
+    main()
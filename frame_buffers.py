@@ -0,0 +1,23 @@
+# frame_buffers.py
+# Image buffers for the vision loops, allocated once per resolution and handed to OpenCV
+# as dst= outputs, so a steady camera stream allocates no new images frame after frame.
+#
+#   buffers = FrameBuffers()
+#   hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=buffers.get("hsv", frame.shape))
+#   mask = cv2.inRange(hsv, lower, upper, dst=buffers.get("mask", frame.shape[:2]))
+import numpy as np
+
+
+class FrameBuffers:
+    """Named, reusable arrays. A buffer is only reallocated when the requested shape or dtype changes."""
+
+    def __init__(self):
+        self._buffers = {}
+        self.allocations = 0  # Stays flat once the loop has seen its first frame
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype=dtype)
+            self.allocations += 1
+        return buffer
@@ -0,0 +1,188 @@
+# gait_planner.py
+# Plans the command sequence that makes the Bittle walk the outline of any polygon.
+# This generalizes the turn arithmetic done by hand in cali_tri
+# ("2 pivot turns = 90 degrees, so 140/45 = ~3 turns") to any shape and any calibration.
+import itertools
+import math
+
+import argparse
+
+from calibration import COMMAND_MOTION, MEASURED_MOTION
+from path_compiler import normalize_angle
+
+
+def apply_motion(pose, motion):
+    """
+    Moves a pose (x, y, heading) by one command from the motion table.
+    Turning gaits are modelled as half the turn, the stride, then the other half.
+    """
+    x, y, heading = pose
+    turn, stride = motion[0], motion[1]
+    heading += turn / 2
+    x += stride * math.cos(math.radians(heading))
+    y += stride * math.sin(math.radians(heading))
+    return (x, y, heading + turn / 2)
+
+def _turn_options(calibration, max_turn_commands):
+    """Every mix of up to max_turn_commands turning commands, with its net motion and time."""
+    turns = [command for command, motion in calibration.items() if motion[0] != 0]
+    options = {(): ((0.0, 0.0, 0.0), 0.0)}
+    for count in range(1, max_turn_commands + 1):
+        for combo in itertools.combinations_with_replacement(turns, count):
+            pose = (0.0, 0.0, 0.0)
+            for command in combo:
+                pose = apply_motion(pose, calibration[command])
+            seconds = sum(calibration[command][2] for command in combo)
+            options[combo] = (pose, seconds)
+
+    # Keep only the fastest mix for each distinct net motion
+    best = {}
+    for combo, (pose, seconds) in options.items():
+        key = tuple(round(value, 1) for value in pose)
+        if key not in best or seconds < best[key][2]:
+            best[key] = (combo, pose, seconds)
+    return list(best.values())
+
+def _commands(node):
+    """Unwinds the parent links of a search node into the command list."""
+    chunks = []
+    while node is not None:
+        node, chunk = node
+        chunks.append(chunk)
+    return [command for chunk in reversed(chunks) for command in chunk]
+
+def plan_polygon(vertices, calibration=MEASURED_MOTION, error_weight=0.5, heading_weight=0.05,
+                 close=True, heading=None, beam_width=64, max_turn_commands=6):
+    """
+    Finds the command sequence that walks through the polygon's vertices.
+
+    calibration defaults to the measured commands only; pass COMMAND_MOTION (or
+    calibration_for(True)) to also use the estimated trot and backward gaits.
+    vertices are (x, y) in centimeters. The robot starts on the first vertex, facing
+    `heading` (default: along the first side). The search scores every candidate by
+    total execution time plus error_weight seconds per centimeter of position error
+    at each vertex, and keeps the beam_width best partial plans per vertex. With close
+    set, the robot returns to the first vertex and turns back to its starting heading.
+
+    Returns (commands, stats).
+    """
+    vertices = [tuple(map(float, vertex)) for vertex in vertices]
+    if len(vertices) < 2:
+        return [], {"seconds": 0.0, "total_error": 0.0, "max_error": 0.0, "final_error": 0.0}
+
+    if heading is None:
+        heading = math.degrees(math.atan2(vertices[1][1] - vertices[0][1], vertices[1][0] - vertices[0][0]))
+    start_heading = heading
+
+    walks = [(command, motion) for command, motion in calibration.items()
+             if motion[0] == 0 and motion[1] > 0]
+    turn_options = _turn_options(calibration, max_turn_commands)
+    targets = vertices[1:] + vertices[:1] if close else vertices[1:]
+
+    # State: (score, pose, seconds, total_error, max_error, error, node)
+    beam = [(0.0, (vertices[0][0], vertices[0][1], heading), 0.0, 0.0, 0.0, 0.0, None)]
+    for target in targets:
+        candidates = []
+        for score, pose, seconds, total_error, max_error, _, node in beam:
+            x, y, h = pose
+            cos_h = math.cos(math.radians(h))
+            sin_h = math.sin(math.radians(h))
+            for combo, (dx, dy, dh), turn_seconds in turn_options:
+                # Rotate the turn's net motion into the world frame
+                tx = x + dx * cos_h - dy * sin_h
+                ty = y + dx * sin_h + dy * cos_h
+                th = h + dh
+                direction = (math.cos(math.radians(th)), math.sin(math.radians(th)))
+                along = (target[0] - tx) * direction[0] + (target[1] - ty) * direction[1]
+                if along < 0:
+                    continue  # facing away from the vertex
+
+                for walk, (_, stride, walk_seconds) in walks:
+                    nearest = round(along / stride)
+                    for steps in {max(0, nearest - 1), nearest, nearest + 1}:
+                        ex = tx + steps * stride * direction[0]
+                        ey = ty + steps * stride * direction[1]
+                        error = math.hypot(target[0] - ex, target[1] - ey)
+                        total = seconds + turn_seconds + steps * walk_seconds
+                        candidates.append((
+                            total + error_weight * (total_error + error),
+                            (ex, ey, th),
+                            total,
+                            total_error + error,
+                            max(max_error, error),
+                            error,
+                            (node, list(combo) + [walk] * steps),
+                        ))
+        candidates.sort(key=lambda state: state[0])
+        beam = candidates[:beam_width]
+
+    if close:
+        # Turn back to the starting heading so the shape can be repeated
+        finished = []
+        for score, pose, seconds, total_error, max_error, error, node in beam:
+            for combo, (dx, dy, dh), turn_seconds in turn_options:
+                if dx or dy:
+                    continue
+                heading_error = abs(normalize_angle(pose[2] + dh - start_heading))
+                finished.append((score + turn_seconds + heading_weight * heading_error,
+                                 pose, seconds + turn_seconds, total_error, max_error, error,
+                                 (node, list(combo))))
+        finished.sort(key=lambda state: state[0])
+        beam = finished[:1]
+
+    _, pose, seconds, total_error, max_error, error, node = beam[0]
+    stats = {
+        "seconds": seconds,
+        "total_error": total_error,
+        "max_error": max_error,
+        "final_error": error,
+    }
+    return _commands(node), stats
+
+def polygon_from_contour(contour, size_cm=40.0, epsilon=0.02):
+    """
+    Turns a camera contour (as passed to get_shape_name) into polygon vertices in centimeters,
+    scaled so the larger side of its bounding box is size_cm. Image Y points down, so it is flipped.
+    """
+    import cv2
+
+    perimeter = cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, epsilon * perimeter, True).reshape(-1, 2)
+    x, y, w, h = cv2.boundingRect(approx)
+    scale = size_cm / max(w, h, 1)
+    return [((px - x) * scale, (y + h - py) * scale) for px, py in approx.tolist()]
+
+def regular_polygon(sides, side_cm):
+    """Vertices of a regular polygon walked counter-clockwise, starting at the origin along +x."""
+    vertices = [(0.0, 0.0)]
+    heading = 0.0
+    for _ in range(sides - 1):
+        x, y = vertices[-1]
+        vertices.append((x + side_cm * math.cos(math.radians(heading)),
+                         y + side_cm * math.sin(math.radians(heading))))
+        heading += 360.0 / sides
+    return vertices
+
+def calibration_for(use_estimated):
+    """The motion table a planner should use: measured entries, plus the estimates if asked."""
+    return COMMAND_MOTION if use_estimated else MEASURED_MOTION
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan the Bittle commands for a few regular polygons.")
+    parser.add_argument("--estimated", action="store_true", help="also plan with the unmeasured trot/backward gaits")
+    args = parser.parse_args()
+    calibration = calibration_for(args.estimated)
+
+    shapes = {
+        "Triangle": regular_polygon(3, 30),
+        "Square": regular_polygon(4, 30),
+        "Pentagon": regular_polygon(5, 20),
+    }
+    for name, vertices in shapes.items():
+        commands, stats = plan_polygon(vertices, calibration)
+        print(f"{name}: {len(commands)} commands, {stats['seconds']:.1f}s, "
+              f"max error {stats['max_error']:.1f} cm, final error {stats['final_error']:.1f} cm")
+        print("   ", [command.decode().strip() for command in commands])
+
+if __name__ == "__main__":
+    main()
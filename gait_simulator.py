@@ -0,0 +1,167 @@
+# gait_simulator.py
+# Dead reckoning for command sequences: shows the path a program will walk and how far
+# it ends from where it started, without putting the robot on the floor.
+# Uses the same motion model as gait_planner.apply_motion (half the turn, the stride,
+# then the other half), but integrates whole batches of sequences at once with NumPy.
+import argparse
+
+import numpy as np
+
+from calibration import COMMAND_MOTION
+
+
+def _motion_arrays(calibration):
+    """Command -> row index, and the turn/stride of each row. The last row is 'no motion'."""
+    index = {command: i for i, command in enumerate(calibration)}
+    turns = np.array([motion[0] for motion in calibration.values()] + [0.0], dtype=np.float64)
+    strides = np.array([motion[1] for motion in calibration.values()] + [0.0], dtype=np.float64)
+    return index, turns, strides
+
+def encode_sequences(sequences, calibration=COMMAND_MOTION):
+    """
+    Turns a list of command sequences into a (B, L) matrix of motion rows, padded with
+    the 'no motion' row. Stance commands such as kbalance don't move the robot, so they
+    map to the same row.
+    """
+    index, _, _ = _motion_arrays(calibration)
+    still = len(index)
+    length = max((len(sequence) for sequence in sequences), default=0)
+    codes = np.full((len(sequences), length), still, dtype=np.intp)
+    for row, sequence in enumerate(sequences):
+        codes[row, :len(sequence)] = [index.get(command, still) for command in sequence]
+    return codes
+
+def simulate_batch(sequences, calibration=COMMAND_MOTION, start=(0.0, 0.0, 0.0)):
+    """
+    Integrates many sequences at once.
+
+    sequences is a list of command lists (or codes from encode_sequences). start is
+    (x, y, heading) in centimeters and degrees. Returns a (B, L + 1, 3) array of poses;
+    shorter sequences hold their last pose.
+    """
+    _, turns, strides = _motion_arrays(calibration)
+    codes = sequences if isinstance(sequences, np.ndarray) else encode_sequences(sequences, calibration)
+
+    turn = turns[codes]
+    stride = strides[codes]
+    heading = start[2] + np.cumsum(turn, axis=1)
+    travel = np.radians(heading - turn / 2)
+
+    poses = np.empty((codes.shape[0], codes.shape[1] + 1, 3))
+    poses[:, 0] = start
+    poses[:, 1:, 0] = start[0] + np.cumsum(stride * np.cos(travel), axis=1)
+    poses[:, 1:, 1] = start[1] + np.cumsum(stride * np.sin(travel), axis=1)
+    poses[:, 1:, 2] = heading
+    return poses
+
+def simulate(sequence, calibration=COMMAND_MOTION, start=(0.0, 0.0, 0.0)):
+    """The (N + 1, 3) pose trajectory of a single sequence."""
+    return simulate_batch([sequence], calibration, start)[0]
+
+def score_batch(poses, target=None):
+    """
+    Scores simulated trajectories (from simulate_batch).
+
+    Returns a dict of (B,) arrays: closure_error is how far (cm) each trajectory ends
+    from its start, heading_error how far (degrees) it ends from its start heading.
+    With a target polygon (list of (x, y) in cm, starting at the robot's start point),
+    vertex_error is the mean distance from each target vertex to the nearest pose.
+    """
+    closure = np.hypot(poses[:, -1, 0] - poses[:, 0, 0], poses[:, -1, 1] - poses[:, 0, 1])
+    heading = (poses[:, -1, 2] - poses[:, 0, 2] + 180.0) % 360.0 - 180.0
+    scores = {"closure_error": closure, "heading_error": np.abs(heading)}
+
+    if target is not None:
+        target = np.asarray(target, dtype=np.float64)
+        # (B, V, N) distances from every target vertex to every pose
+        dx = target[None, :, None, 0] - poses[:, None, :, 0]
+        dy = target[None, :, None, 1] - poses[:, None, :, 1]
+        scores["vertex_error"] = np.hypot(dx, dy).min(axis=2).mean(axis=1)
+    return scores
+
+def score_sequence(sequence, target=None, calibration=COMMAND_MOTION):
+    poses = simulate_batch([sequence], calibration)
+    return {name: float(values[0]) for name, values in score_batch(poses, target).items()}
+
+def render_image(poses, size=400, margin=20, target=None):
+    """Draws a trajectory (and optionally the target polygon) on a white BGR image."""
+    import cv2
+
+    points = poses[:, :2]
+    if target is not None:
+        target = np.asarray(target, dtype=np.float64)
+        bounds = np.vstack([points, target])
+    else:
+        bounds = points
+    low = bounds.min(axis=0)
+    scale = (size - 2 * margin) / max(float((bounds.max(axis=0) - low).max()), 1.0)
+
+    def to_pixels(xy):
+        pixels = (xy - low) * scale + margin
+        pixels[:, 1] = size - pixels[:, 1]  # Y points up on the floor, down in the image
+        return np.round(pixels).astype(np.int32).reshape(-1, 1, 2)
+
+    canvas = np.full((size, size, 3), 255, dtype=np.uint8)
+    if target is not None:
+        cv2.polylines(canvas, [to_pixels(target)], True, (200, 200, 200), 2)
+    cv2.polylines(canvas, [to_pixels(points)], False, (255, 0, 0), 2)
+    start, end = to_pixels(points[:1])[0, 0], to_pixels(points[-1:])[0, 0]
+    cv2.circle(canvas, tuple(int(v) for v in start), 5, (0, 160, 0), -1)
+    cv2.circle(canvas, tuple(int(v) for v in end), 5, (0, 0, 255), -1)
+    return canvas
+
+def render_turtle(poses, scale=5.0):
+    """Walks a turtle along the trajectory, one move per command."""
+    import turtle
+
+    pen = turtle.Turtle()
+    pen.speed(0)
+    pen.penup()
+    pen.goto(poses[0, 0] * scale, poses[0, 1] * scale)
+    pen.setheading(poses[0, 2])
+    pen.pendown()
+    for x, y, heading in poses[1:]:
+        pen.goto(x * scale, y * scale)
+        pen.setheading(heading)
+    return pen
+
+def main():
+    import cali_tri
+    import shape_Bittle_test
+    import triangle_test
+
+    parser = argparse.ArgumentParser(description="Preview the path Bittle programs will walk.")
+    parser.add_argument("--turtle", action="store_true", help="draw each program with turtle")
+    parser.add_argument("--save", action="store_true", help="write a PNG preview of each program")
+    args = parser.parse_args()
+
+    programs = {
+        "cali_tri SQUARE": cali_tri.SQUARE_SEQUENCE,
+        "cali_tri TRIANGLE": cali_tri.TRIANGLE_SEQUENCE,
+        "triangle_test": triangle_test.YOUR_TRIANGLE_SEQUENCE,
+        "shape_Bittle_test SQUARE": shape_Bittle_test.SQUARE_SEQUENCE,
+    }
+    poses = simulate_batch(list(programs.values()))
+    scores = score_batch(poses)
+    for row, name in enumerate(programs):
+        length = len(programs[name])
+        x, y, heading = poses[row, length]
+        print(f"{name}: ends at ({x:.1f}, {y:.1f}) cm facing {heading:.0f} deg, "
+              f"closure error {scores['closure_error'][row]:.1f} cm, "
+              f"heading error {scores['heading_error'][row]:.0f} deg")
+        if args.save:
+            import cv2
+
+            filename = name.replace(" ", "_") + "_preview.png"
+            cv2.imwrite(filename, render_image(poses[row, :length + 1]))
+            print(f"    saved {filename}")
+
+    if args.turtle:
+        import turtle
+
+        for row, name in enumerate(programs):
+            render_turtle(poses[row, :len(programs[name]) + 1])
+        turtle.done()
+
+if __name__ == "__main__":
+    main()
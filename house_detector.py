@@ -2,6 +2,10 @@
 import cv2
 import numpy as np
 
+from flight_recorder import DUMP_KEY, FlightRecorder
+from frame_buffers import FrameBuffers
+from stage_profiler import OVERLAY_KEY, StageProfiler
+
 def is_house_shape(contour):
     """
     Analyzes a contour to determine if it represents a house shape.
@@ -145,97 +149,135 @@ def get_house_confidence(contour):
     return min(confidence, 100)  # Cap at 100%
 
 # --- Main Program ---
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open camera.")
-    exit()
+def main():
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        print("Error: Could not open camera.")
+        return
 
-print("\n--- Starting House Shape Detector ---")
-print("INFO: Point objects at the camera to detect house-like shapes.")
-print("INFO: Watch the TERMINAL for detection details.")
-print("Press 'q' to quit, 's' to toggle sensitivity")
+    print("\n--- Starting House Shape Detector ---")
+    print("INFO: Point objects at the camera to detect house-like shapes.")
+    print("INFO: Watch the TERMINAL for detection details.")
+    print("Press 'q' to quit, 's' to toggle sensitivity, 'o' for stage timings, 'f' to dump the last seconds")
 
-# Detection sensitivity (can be adjusted)
-min_confidence = 85  # MUCH HIGHER - was 70, now 85
-show_all_detections = False  # Show all shapes or just high-confidence ones
+    # Detection sensitivity (can be adjusted)
+    min_confidence = 85  # MUCH HIGHER - was 70, now 85
+    show_all_detections = False  # Show all shapes or just high-confidence ones
+    profiler = StageProfiler("house_detector")
+    buffers = FrameBuffers()  # ROI images are written into these instead of being allocated every frame
+    recorder = FlightRecorder(name="house_detector")
+    frame = None
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    try:
+        while True:
+            ret, frame = cap.read(frame)
+            profiler.lap("capture")
+            if not ret:
+                break
+            recorder.record(frame)  # Before the ROI and labels are drawn on it
         
-    frame_height, frame_width, _ = frame.shape
-    roi_size = 450  # Slightly larger ROI for house detection
-    x1 = (frame_width - roi_size) // 2
-    y1 = (frame_height - roi_size) // 2
-    x2 = x1 + roi_size
-    y2 = y1 + roi_size
-    
-    # Draw ROI rectangle
-    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-    roi = frame[y1:y2, x1:x2]
+            frame_height, frame_width, _ = frame.shape
+            roi_size = 450  # Slightly larger ROI for house detection
+            x1 = (frame_width - roi_size) // 2
+            y1 = (frame_height - roi_size) // 2
+            x2 = x1 + roi_size
+            y2 = y1 + roi_size
+    
+            # Draw ROI rectangle
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            roi = frame[y1:y2, x1:x2]
 
-    # Image processing
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            # Image processing
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=buffers.get("gray", roi.shape[:2]))
+            profiler.lap("convert")
     
-    # Use adaptive threshold for better edge detection
-    threshold = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                    cv2.THRESH_BINARY_INV, 11, 2)
+            # Use adaptive threshold for better edge detection
+            threshold = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                            cv2.THRESH_BINARY_INV, 11, 2, dst=buffers.get("threshold", roi.shape[:2]))
+            profiler.lap("threshold")
     
-    # Find contours
-    contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Find contours
+            contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            profiler.lap("contours")
     
-    house_detected = False
+            house_detected = False
+            best_confidence = None
     
-    for cnt in contours:
-        if cv2.contourArea(cnt) > 1500:  # HIGHER minimum area - was 800
-            confidence = get_house_confidence(cnt)
+            for cnt in contours:
+                if cv2.contourArea(cnt) > 1500:  # HIGHER minimum area - was 800
+                    confidence = get_house_confidence(cnt)
+                    if best_confidence is None or confidence > best_confidence:
+                        best_confidence = confidence
             
-            if confidence >= min_confidence or show_all_detections:
-                M = cv2.moments(cnt)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"]) + x1
-                    cy = int(M["m01"] / M["m00"]) + y1
+                    if confidence >= min_confidence or show_all_detections:
+                        M = cv2.moments(cnt)
+                        if M["m00"] != 0:
+                            cx = int(M["m10"] / M["m00"]) + x1
+                            cy = int(M["m01"] / M["m00"]) + y1
                     
-                    # Color coding based on confidence
-                    if confidence >= 80:
-                        color = (0, 255, 0)    # Green - High confidence
-                        text = f"HOUSE! ({confidence}%)"
-                        house_detected = True
-                    elif confidence >= min_confidence:
-                        color = (0, 165, 255)  # Orange - Medium confidence
-                        text = f"House? ({confidence}%)"
-                        house_detected = True
-                    else:
-                        color = (0, 0, 255)    # Red - Low confidence
-                        text = f"Shape ({confidence}%)"
+                            # Color coding based on confidence
+                            if confidence >= 80:
+                                color = (0, 255, 0)    # Green - High confidence
+                                text = f"HOUSE! ({confidence}%)"
+                                house_detected = True
+                            elif confidence >= min_confidence:
+                                color = (0, 165, 255)  # Orange - Medium confidence
+                                text = f"House? ({confidence}%)"
+                                house_detected = True
+                            else:
+                                color = (0, 0, 255)    # Red - Low confidence
+                                text = f"Shape ({confidence}%)"
                     
-                    # Draw contour and label
-                    cv2.drawContours(frame, [cnt + [x1, y1]], -1, color, 2)
-                    cv2.putText(frame, text, (cx - 60, cy), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+                            # Draw contour and label
+                            cv2.drawContours(frame, [cnt + [x1, y1]], -1, color, 2)
+                            cv2.putText(frame, text, (cx - 60, cy), 
+                                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            profiler.lap("classify")
+            recorder.label("decision", "house" if house_detected else "scanning")
+            if best_confidence is not None:
+                # Named like the on-screen labels of the most house-like contour
+                if best_confidence >= 80:
+                    recorder.label("shape", "house")
+                elif best_confidence >= min_confidence:
+                    recorder.label("shape", "house?")
+                else:
+                    recorder.label("shape", "shape")
+                recorder.label("confidence", best_confidence)
+            if house_detected:
+                recorder.trigger("house")
     
    
-    status_text = "HOUSE DETECTED!" if house_detected else "Scanning..."
-    status_color = (0, 255, 0) if house_detected else (255, 255, 255)
-    cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
+            status_text = "HOUSE DETECTED!" if house_detected else "Scanning..."
+            status_color = (0, 255, 0) if house_detected else (255, 255, 255)
+            cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
     
    
-    cv2.putText(frame, f"Min Confidence: {min_confidence}%", (10, frame_height - 60), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-    cv2.putText(frame, f"Show All: {'ON' if show_all_detections else 'OFF'}", 
-                (10, frame_height - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-    cv2.putText(frame, "Press 's' to toggle sensitivity", (10, frame_height - 20), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+            cv2.putText(frame, f"Min Confidence: {min_confidence}%", (10, frame_height - 60), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            cv2.putText(frame, f"Show All: {'ON' if show_all_detections else 'OFF'}", 
+                        (10, frame_height - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            cv2.putText(frame, "Press 's' to toggle sensitivity", (10, frame_height - 20), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
 
-    cv2.imshow("House Shape Detector", frame)
+            profiler.end_frame(frame)
+            with profiler.stage("display"):
+                cv2.imshow("House Shape Detector", frame)
+                key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == OVERLAY_KEY:
+                profiler.toggle_overlay()
+            elif key == DUMP_KEY:
+                recorder.dump("manual")
+            elif key == ord('s'):
+                show_all_detections = not show_all_detections
+                print(f"Show all detections: {'ON' if show_all_detections else 'OFF'}")
+    except Exception:
+        recorder.dump("exception")
+        raise
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
 
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord('q'):
-        break
-    elif key == ord('s'):
-        show_all_detections = not show_all_detections
-        print(f"Show all detections: {'ON' if show_all_detections else 'OFF'}")
-        
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
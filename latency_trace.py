@@ -0,0 +1,126 @@
+# latency_trace.py
+# How long from a card appearing in front of the camera to the command leaving the
+# serial port, and to the robot answering? Every frame gets an id and a capture time;
+# the loop marks when it decided and when it wrote, and an ack hook marks when the
+# firmware answered. Records live in preallocated NumPy rings.
+#
+#   tracer = LatencyTracer()
+#   frame_id = tracer.capture()          # right after cap.read()
+#   tracer.decide(frame_id)              # once the command for this frame is known
+#   tracer.write(frame_id, "kwkF")       # right after ser.write(), with the token written
+#   tracer.ack("kwkF")                   # when the firmware echoes it (oldest such write)
+#   print(tracer.report())
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+TRACE_SIZE = 4096  # Frames kept for the distributions
+
+# Segment name -> (start column, end column)
+SEGMENTS = {
+    "capture->decision": ("capture", "decision"),
+    "decision->write": ("decision", "write"),
+    "write->ack": ("write", "ack"),
+    "capture->write": ("capture", "write"),
+}
+
+
+class LatencyTracer:
+    """Per-frame timestamps from capture to decision, serial write and firmware ack."""
+
+    def __init__(self, size=TRACE_SIZE, clock=time.perf_counter):
+        self.size = size
+        self.clock = clock
+        self.columns = {name: np.full(size, np.nan) for name in ("capture", "decision", "write", "ack")}
+        self.frame_ids = np.full(size, -1, dtype=np.int64)
+        self.next_id = 0
+        self._unacked = deque(maxlen=size)  # (frame id, token) written but not yet answered, oldest first
+        self._unacked_lock = threading.Lock()  # write() runs on the loop, ack() on the telemetry thread
+
+    def _slot(self, frame_id):
+        """Ring index of a frame, or None once it has been overwritten."""
+        slot = frame_id % self.size
+        return slot if self.frame_ids[slot] == frame_id else None
+
+    def capture(self, when=None):
+        """Starts a frame. Returns its id."""
+        frame_id = self.next_id
+        self.next_id += 1
+        slot = frame_id % self.size
+        self.frame_ids[slot] = frame_id
+        for column in self.columns.values():
+            column[slot] = np.nan
+        self.columns["capture"][slot] = self.clock() if when is None else when
+        return frame_id
+
+    def _mark(self, name, frame_id, when):
+        slot = self._slot(frame_id)
+        if slot is not None:
+            self.columns[name][slot] = self.clock() if when is None else when
+
+    def decide(self, frame_id, when=None):
+        self._mark("decision", frame_id, when)
+
+    def write(self, frame_id, token=None, when=None):
+        """Marks the serial write of a frame's command; token is what the firmware will echo."""
+        self._mark("write", frame_id, when)
+        with self._unacked_lock:
+            self._unacked.append((frame_id, token))
+
+    def ack(self, token=None, when=None):
+        """
+        Hook for firmware responses: matches the oldest write of the same token still waiting
+        for one (or the oldest write of any token when none is given). Returns its frame id.
+        """
+        when = self.clock() if when is None else when
+        with self._unacked_lock:
+            for entry in self._unacked:
+                frame_id, written = entry
+                if token is None or written == token:
+                    self._unacked.remove(entry)
+                    break
+            else:
+                return None
+        if self._slot(frame_id) is None:
+            return None  # Overwritten in the ring since
+        self._mark("ack", frame_id, when)
+        return frame_id
+
+    def distributions(self):
+        """{segment: array of seconds} over the frames that reached both ends."""
+        result = {}
+        for segment, (start, end) in SEGMENTS.items():
+            delta = self.columns[end] - self.columns[start]
+            result[segment] = delta[~np.isnan(delta)]
+        return result
+
+    def summary(self):
+        """{segment: {count, p50_ms, p99_ms, max_ms}}."""
+        result = {}
+        for segment, values in self.distributions().items():
+            if len(values):
+                p50, p99 = np.percentile(values, (50, 99)) * 1000
+                result[segment] = {"count": int(len(values)), "p50_ms": round(float(p50), 3),
+                                   "p99_ms": round(float(p99), 3), "max_ms": round(float(values.max()) * 1000, 3)}
+            else:
+                result[segment] = {"count": 0}
+        return result
+
+    def report(self):
+        lines = [f"Latency over the last {min(self.next_id, self.size)} frames:"]
+        for segment, stats in self.summary().items():
+            if stats["count"]:
+                lines.append(f"  {segment}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+                             f"max {stats['max_ms']:.2f} ms ({stats['count']} samples)")
+            else:
+                lines.append(f"  {segment}: no samples")
+        return "\n".join(lines)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -5,6 +5,11 @@ import serial
 import time
 import numpy as np # <--- THIS IS THE MISSING LINE THAT FIXES THE ERROR
 
+from command_timing import load_durations
+from telemetry import TelemetryReader
+from teleop_recorder import SessionRecorder
+from transport import BittleTransport
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -16,6 +21,21 @@ TURN_RIGHT = b'kvtR\n'
 BALANCE = b'kbalance\n'
 REST = b'd\n'
 
+# Which key drives which command
+KEY_COMMANDS = {
+    ord('w'): (WALK_FORWARD, "Walk Forward"),
+    ord('a'): (TURN_LEFT, "Turn Left"),
+    ord('d'): (TURN_RIGHT, "Turn Right"),
+}
+
+# --- Input Configuration ---
+KEY_POLL_MS = 30  # waitKey returns as soon as a key arrives, so this only sets the idle tick
+# OpenCV reports no key-up events, so a held key is recognised by the OS auto-repeat
+FIRST_REPEAT_DELAY = 0.6  # The OS waits about 250-600 ms before the first repeat of a held key
+REPEAT_INTERVAL = 0.15  # After that, repeats come closer together than this
+RELEASE_TIMEOUT = 0.6  # A held key counts as released after this long without a repeat
+MAX_QUEUED = 2  # Presses beyond this many waiting commands are dropped instead of piling up
+
 def connect_to_bittle():
     """Tries to connect to the serial port."""
     try:
@@ -27,66 +47,166 @@ def connect_to_bittle():
         print(f"Error: Could not connect to {SERIAL_PORT}. Details: {e}")
         return None
 
+class KeyInput:
+    """
+    Turns raw key events into robot commands without blocking.
+
+    A tap queues one command. Holding a key makes the OS repeat it; once repeats come
+    at auto-repeat cadence they are folded into the gait already running (Bittle gaits
+    keep going until the next command), and when they stop the robot is balanced again.
+    A second event soon after a tap can be either the first auto-repeat or a deliberate
+    second tap (double-tapping a turn), so it is held back until the next event shows
+    which: another event right behind it means a held key, none means a tap to send.
+    """
+
+    def __init__(self, transport, durations):
+        self.transport = transport
+        self.durations = durations
+        self.held_key = None
+        self.holding = False
+        self.last_event = 0.0
+        self.maybe_tap = None  # Time of a second event not yet known to be a tap or a repeat
+        self.status = "Ready"
+
+    def _send(self, key):
+        command, name = KEY_COMMANDS[key]
+        if self.transport.pending() >= MAX_QUEUED:
+            self.status = f"Busy, dropped {name}"
+            return
+        self.transport.send(command, self.durations.duration(command))
+        self.status = name
+        print(f"Sent: {name}")
+
+    def _flush_tap(self, now):
+        """Sends a held-back second event once no repeat has followed it in time."""
+        if self.maybe_tap is not None and now - self.maybe_tap >= REPEAT_INTERVAL:
+            self.maybe_tap = None
+            self._send(self.held_key)
+
+    def key_event(self, key, now):
+        if key not in KEY_COMMANDS:
+            return
+        self._flush_tap(now)
+        if key == self.held_key:
+            if self.holding and now - self.last_event < REPEAT_INTERVAL:
+                self.last_event = now
+                return
+            if self.maybe_tap is not None:
+                # Right behind the previous event: the OS is repeating a held key
+                self.maybe_tap = None
+                self.holding = True
+                self.last_event = now
+                self.status = f"{KEY_COMMANDS[key][1]} (held)"
+                return
+            if not self.holding and now - self.last_event < FIRST_REPEAT_DELAY:
+                self.maybe_tap = now
+                self.last_event = now
+                return
+
+        if self.maybe_tap is not None:
+            self.maybe_tap = None
+            self._send(self.held_key)  # Another key came next, so that one was a tap
+        self.held_key = key
+        self.holding = False
+        self.last_event = now
+        self._send(key)
+
+    def tick(self, now):
+        """Sends a second tap once it is clear it was one, and ends a held gait once its key has stopped repeating."""
+        self._flush_tap(now)
+        timeout = RELEASE_TIMEOUT if self.holding else FIRST_REPEAT_DELAY
+        if self.held_key is not None and self.maybe_tap is None and now - self.last_event > timeout:
+            if self.holding:
+                latency = self.transport.stop(BALANCE)
+                self.status = "Released, balancing"
+                print(f"Released: Balance ({latency * 1000:.1f} ms)")
+            self.held_key = None
+            self.holding = False
+
+    def stop(self):
+        self.held_key = None
+        self.holding = False
+        self.maybe_tap = None
+        latency = self.transport.stop(BALANCE)
+        self.status = "Stopped"
+        print(f"Sent: Balance / Stop ({latency * 1000:.1f} ms)")
+
+def draw_window(background, status, queued):
+    """Renders the control window. Only called when what it shows has changed."""
+    window = background.copy()
+    cv2.putText(window, f"Last: {status}", (20, 140), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
+    cv2.putText(window, f"Queued: {queued}", (20, 170), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+    cv2.imshow("Bittle Remote Control", window)
+
 def main():
     bittle_serial = connect_to_bittle()
     if not bittle_serial:
         return
 
-    # We just need a simple window to capture key presses
-    # This line now works because we imported numpy as np
+    # We just need a simple window to capture key presses; the fixed text is drawn once
     control_window = np.zeros((200, 400, 3), dtype=np.uint8)
+    cv2.putText(control_window, "Click Here & Use Keys", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    cv2.putText(control_window, "w: Fwd, a: Left, d: Right, s: Stop, q: Quit", (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    durations = load_durations(executor="life_driver")
+    transport = BittleTransport(bittle_serial)
+    keys = KeyInput(transport, durations)
+    # Everything written to the robot is logged, so a sequence found here can be replayed or saved
+    recorder = SessionRecorder.start()
+    transport.on_write = recorder.record
+
+    def on_alert(message):
+        # Runs on the telemetry thread; the transport is safe to stop from there
+        print(f"ALERT: {message}")
+        keys.status = message
+        if telemetry.tipped():
+            transport.stop(BALANCE)
+
+    # Bound before the thread starts: on_alert may run as soon as it does
+    telemetry = TelemetryReader(bittle_serial, on_alert=on_alert)
+    telemetry.start()
     
     try:
         print("\n--- Bittle Live Driver ---")
         print("INFO: Click on the 'Bittle Remote Control' window.")
         print("CONTROLS:")
-        print("  w = Walk Forward (1 step)")
-        print("  a = Turn Left (1 sharp step)")
-        print("  d = Turn Right (1 sharp step)")
+        print("  w = Walk Forward (tap for 1 step, hold to keep walking)")
+        print("  a = Turn Left (tap for 1 sharp step, hold to keep turning)")
+        print("  d = Turn Right (tap for 1 sharp step, hold to keep turning)")
         print("  s = Balance / Stop")
         print("  q = Quit and Rest")
+        print(f"Recording to {recorder.path}")
         print("--------------------------")
         
-        bittle_serial.write(BALANCE)
+        transport.send(BALANCE)
+        shown = None
         
         while True:
-            # Display the control window
-            window_copy = control_window.copy()
-            cv2.putText(window_copy, "Click Here & Use Keys", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            cv2.putText(window_copy, "w: Fwd, a: Left, d: Right, s: Stop, q: Quit", (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            cv2.imshow("Bittle Remote Control", window_copy)
+            view = (keys.status, transport.pending())
+            if view != shown:
+                draw_window(control_window, *view)
+                shown = view
             
-            key = cv2.waitKey(1) & 0xFF
+            key = cv2.waitKey(KEY_POLL_MS) & 0xFF
+            now = time.monotonic()
 
-            command_to_send = None
-            
-            if key == ord('w'):
-                command_to_send = WALK_FORWARD
-                print("Sent: Walk Forward")
-            elif key == ord('a'):
-                command_to_send = TURN_LEFT
-                print("Sent: Turn Left")
-            elif key == ord('d'):
-                command_to_send = TURN_RIGHT
-                print("Sent: Turn Right")
-            elif key == ord('s'):
-                command_to_send = BALANCE
-                print("Sent: Balance / Stop")
+            if key == ord('s'):
+                # Stop skips whatever is still queued and interrupts the current step
+                keys.stop()
             elif key == ord('q'):
                 print("Quit command received.")
                 break # Exit the loop
-            
-            if command_to_send:
-                bittle_serial.write(command_to_send)
-                # Give the robot a moment to process before the next key press
-                time.sleep(0.5)
+            elif key != 0xFF:
+                keys.key_event(key, now)
+            keys.tick(now)
 
     finally:
         print("Shutting down...")
-        if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(REST)
-            bittle_serial.close()
+        if bittle_serial.is_open:
+            transport.close(REST)
             print("Serial port closed.")
+        telemetry.stop()
+        recorder.close()
+        print(f"Recorded {recorder.count} commands to {recorder.path}")
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
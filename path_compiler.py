@@ -0,0 +1,124 @@
+# path_compiler.py
+# Compiles turtle_converter paths into Bittle motion programs (kwkF / kvtL / kvtR).
+import math
+import sys
+
+from calibration import DEGREES_PER_PIVOT_TURN, WALK_STRIDE_CM
+
+# --- Command Definitions ---
+WALK_FORWARD = b'kwkF\n'
+TURN_LEFT = b'kvtL\n'
+TURN_RIGHT = b'kvtR\n'
+
+
+def normalize_angle(angle):
+    """Wrap an angle in degrees into the range (-180, 180]."""
+    angle = (angle + 180.0) % 360.0 - 180.0
+    return 180.0 if angle == -180.0 else angle
+
+def _plan_legs(pose, targets, stride, turn_step, commands, errors):
+    """
+    Appends the turns and walks that take the robot from `pose` through each target.
+    Every leg is planned from where the quantized commands actually put the robot,
+    and its stride count comes from the leg projected onto the quantized heading,
+    so the part the heading can't cover isn't walked in the wrong direction.
+    Returns the new pose (x, y, heading).
+    """
+    x, y, heading = pose
+    for target_x, target_y in targets:
+        dx = target_x - x
+        dy = target_y - y
+        # A leg shorter than half a stride would only add turns; fold it into the next one
+        if round(math.hypot(dx, dy) / stride) == 0:
+            continue
+
+        turns = round(normalize_angle(math.degrees(math.atan2(dy, dx)) - heading) / turn_step)
+        new_heading = normalize_angle(heading + turns * turn_step)
+        along = dx * math.cos(math.radians(new_heading)) + dy * math.sin(math.radians(new_heading))
+        steps = round(along / stride)
+        if steps <= 0:
+            continue
+        if turns > 0:
+            commands.extend([TURN_LEFT] * turns)
+        elif turns < 0:
+            commands.extend([TURN_RIGHT] * -turns)
+        heading = new_heading
+        commands.extend([WALK_FORWARD] * steps)
+
+        # Dead-reckon where the robot really ends up
+        x += steps * stride * math.cos(math.radians(heading))
+        y += steps * stride * math.sin(math.radians(heading))
+        errors.append(math.hypot(target_x - x, target_y - y))
+    return x, y, heading
+
+def compile_paths(paths, stride=1.0, turn_step=DEGREES_PER_PIVOT_TURN, heading=90.0):
+    """
+    Turns a list of paths into a program of ("draw", commands) and ("travel", commands)
+    segments. Travel segments move the robot from the end of one path to the start of
+    the next; they are not part of the drawing, so an executor can mark them (lift a
+    pen, change the trail colour) or run them differently.
+
+    `stride` is the path distance covered by one WALK_FORWARD, `turn_step` the
+    heading change of one pivot turn. The robot starts at the first point of the
+    first path facing `heading` (turtle convention: 0 = +x, counter-clockwise).
+    Returns (segments, stats) where stats holds the geometric error of the drawn legs.
+    """
+    segments = []
+    errors = []
+    paths = [path for path in paths if len(path)]
+    if not paths:
+        return segments, {"max_error": 0.0, "mean_error": 0.0, "final_error": 0.0, "travel_commands": 0}
+
+    x, y = paths[0][0]
+    pose = (x, y, heading)
+    travel_commands = 0
+    for i, path in enumerate(paths):
+        if i:
+            travel = []
+            pose = _plan_legs(pose, path[:1], stride, turn_step, travel, [])
+            if travel:
+                segments.append(("travel", travel))
+                travel_commands += len(travel)
+        draw = []
+        pose = _plan_legs(pose, path[1:], stride, turn_step, draw, errors)
+        if draw:
+            segments.append(("draw", draw))
+
+    stats = {
+        "max_error": max(errors, default=0.0),
+        "mean_error": sum(errors) / len(errors) if errors else 0.0,
+        "final_error": errors[-1] if errors else 0.0,
+        "travel_commands": travel_commands,
+    }
+    return segments, stats
+
+def program_commands(segments):
+    """All commands of a compiled program in order, travel included."""
+    return [command for _, commands in segments for command in commands]
+
+def compile_image(image, stride_pixels=50, turn_step=DEGREES_PER_PIVOT_TURN):
+    """Builds a drawing program straight from an image file."""
+    from turtle_converter import image_paths
+
+    paths = image_paths(image)
+    return compile_paths(paths, stride=stride_pixels, turn_step=turn_step)
+
+def main():
+    image = sys.argv[1] if len(sys.argv) > 1 else 'patrick.jpg'
+    stride_pixels = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    segments, stats = compile_image(image, stride_pixels)
+    commands = program_commands(segments)
+
+    walks = commands.count(WALK_FORWARD)
+    turns = len(commands) - walks
+    print(f"Compiled {image}: {len(commands)} commands ({walks} walks, {turns} turns), "
+          f"{stats['travel_commands']} of them travel between paths")
+    print(f"1 stride = {stride_pixels} px = {WALK_STRIDE_CM} cm")
+    print(f"Geometric error (px): max {stats['max_error']:.1f}, "
+          f"mean {stats['mean_error']:.1f}, final {stats['final_error']:.1f}")
+    for kind, commands in segments:
+        print(kind, [command.decode().strip() for command in commands])
+
+if __name__ == "__main__":
+    main()
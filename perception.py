@@ -0,0 +1,218 @@
+# perception.py
+# One camera stream, several detectors. Color cards need HSV, the shape trigger needs a
+# gray threshold, house detection needs an adaptive threshold; run separately, each
+# detector converts the frame itself. The Perception object computes each image the
+# first time a detector asks for it in a frame and hands the same result to the rest.
+#
+#   perception = Perception()
+#   perception.register("color", color_card)
+#   perception.register("shape", shape_trigger)
+#   results = perception.process(frame)  # {"color": "red", "shape": ("Triangle", contour)}
+import cv2
+
+from frame_buffers import FrameBuffers
+
+# --- Detector Settings (the values the single-purpose scripts use) ---
+SHAPE_ROI_SIZE = 400  # test121
+HOUSE_ROI_SIZE = 450  # house_detector
+HOUSE_MIN_AREA = 1500
+HOUSE_MIN_CONFIDENCE = 85
+
+
+def center_roi(shape, size):
+    """(x1, y1, x2, y2) of a size x size box in the middle of a frame of the given shape."""
+    height, width = shape[:2]
+    x1 = max((width - size) // 2, 0)
+    y1 = max((height - size) // 2, 0)
+    return x1, y1, min(x1 + size, width), min(y1 + size, height)
+
+class Perception:
+    """Lazily computed, per-frame images shared by every registered detector."""
+
+    def __init__(self, buffers=None):
+        self.buffers = buffers or FrameBuffers()
+        self.frame = None
+        self.frame_id = -1
+        self.consumers = {}
+        self._cache = {}
+
+    def register(self, name, consumer):
+        """Adds a detector: consumer(perception) is called on every processed frame."""
+        self.consumers[name] = consumer
+
+    def unregister(self, name):
+        self.consumers.pop(name, None)
+
+    def new_frame(self, frame):
+        """Starts a frame; everything computed for the previous one is forgotten."""
+        self.frame = frame
+        self.frame_id += 1
+        self._cache.clear()
+
+    def process(self, frame):
+        """Runs every registered detector on the frame. Returns {name: result}."""
+        self.new_frame(frame)
+        return {name: consumer(self) for name, consumer in self.consumers.items()}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _crop(self, image, roi):
+        if roi is None:
+            return image
+        x1, y1, x2, y2 = roi
+        return image[y1:y2, x1:x2]
+
+    # --- Images ---
+    def hsv(self):
+        return self._cached("hsv", lambda: cv2.cvtColor(
+            self.frame, cv2.COLOR_BGR2HSV, dst=self.buffers.get("hsv", self.frame.shape)))
+
+    def gray(self, roi=None):
+        """Gray is computed once for the whole frame; ROIs are views into it."""
+        full = self._cached("gray", lambda: cv2.cvtColor(
+            self.frame, cv2.COLOR_BGR2GRAY, dst=self.buffers.get("gray", self.frame.shape[:2])))
+        return self._crop(full, roi)
+
+    def blurred(self, roi=None, ksize=5):
+        def compute():
+            gray = self.gray(roi)
+            return cv2.GaussianBlur(gray, (ksize, ksize), 0,
+                                    dst=self.buffers.get(("blurred", roi, ksize), gray.shape))
+        return self._cached(("blurred", roi, ksize), compute)
+
+    def threshold(self, roi=None, level=127, blur=False):
+        """Dark shapes on light paper as white on black (THRESH_BINARY_INV)."""
+        def compute():
+            source = self.blurred(roi) if blur else self.gray(roi)
+            _, binary = cv2.threshold(source, level, 255, cv2.THRESH_BINARY_INV,
+                                      dst=self.buffers.get(("threshold", roi, level, blur), source.shape))
+            return binary
+        return self._cached(("threshold", roi, level, blur), compute)
+
+    def adaptive_threshold(self, roi=None, block_size=11, c=2):
+        def compute():
+            gray = self.gray(roi)
+            return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
+                                         block_size, c,
+                                         dst=self.buffers.get(("adaptive", roi, block_size, c), gray.shape))
+        return self._cached(("adaptive", roi, block_size, c), compute)
+
+    def in_range(self, lower, upper):
+        """HSV color mask. lower/upper are 3-tuples so they can key the cache."""
+        def compute():
+            hsv = self.hsv()
+            return cv2.inRange(hsv, lower, upper, dst=self.buffers.get(("in_range", lower, upper), hsv.shape[:2]))
+        return self._cached(("in_range", lower, upper), compute)
+
+    def in_ranges(self, ranges):
+        """One mask for several HSV ranges OR-ed together, e.g. red on both sides of hue 0/180."""
+        ranges = tuple(ranges)
+        if len(ranges) == 1:
+            return self.in_range(*ranges[0])
+
+        def compute():
+            mask = self.buffers.get(("in_ranges", ranges), self.frame.shape[:2])
+            cv2.bitwise_or(self.in_range(*ranges[0]), self.in_range(*ranges[1]), dst=mask)
+            for lower, upper in ranges[2:]:
+                cv2.bitwise_or(mask, self.in_range(lower, upper), dst=mask)
+            return mask
+        return self._cached(("in_ranges", ranges), compute)
+
+    def contours(self, source, *args, **kwargs):
+        """External contours of one of the binary images above, e.g. contours("threshold", roi)."""
+        key = ("contours", source, args, tuple(sorted(kwargs.items())))
+
+        def compute():
+            binary = getattr(self, source)(*args, **kwargs)
+            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            return contours
+        return self._cached(key, compute)
+
+# --- Detectors ---
+# Each takes the Perception object and returns its result for the frame.
+# The scripts' own functions are reused so the behavior matches running them alone.
+
+def color_card(perception):
+    """The dominant color card in view (sequential_test), or None."""
+    from sequential_test import get_dominant_color
+
+    return get_dominant_color(perception.hsv())
+
+def shape_trigger(perception):
+    """(shape name, contour in frame coordinates) of the first shape in the center box (test121), or None."""
+    from test121 import get_shape_name
+
+    roi = center_roi(perception.frame.shape, SHAPE_ROI_SIZE)
+    for contour in perception.contours("threshold", roi):
+        name = get_shape_name(contour)
+        if name:
+            return name, contour + roi[:2]
+    return None
+
+def house(perception):
+    """(confidence, contour in frame coordinates) of the most house-like shape in the center box, or None."""
+    from house_detector import get_house_confidence
+
+    roi = center_roi(perception.frame.shape, HOUSE_ROI_SIZE)
+    best = None
+    for contour in perception.contours("adaptive_threshold", roi):
+        if cv2.contourArea(contour) > HOUSE_MIN_AREA:
+            confidence = get_house_confidence(contour)
+            if confidence >= HOUSE_MIN_CONFIDENCE and (best is None or confidence > best[0]):
+                best = (confidence, contour + roi[:2])
+    return best
+
+def main():
+    """Runs color, shape and house detection together on one camera stream."""
+    from stage_profiler import OVERLAY_KEY, StageProfiler
+
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        print("Error: Could not open camera.")
+        return
+
+    perception = Perception()
+    perception.register("color", color_card)
+    perception.register("shape", shape_trigger)
+    perception.register("house", house)
+    profiler = StageProfiler("perception")
+    print("Press 'o' for stage timings, 'q' to quit.")
+
+    frame = None
+    try:
+        while True:
+            ret, frame = cap.read(frame)
+            profiler.lap("capture")
+            if not ret:
+                break
+
+            results = perception.process(frame)
+            profiler.lap("detect")
+
+            cv2.putText(frame, f"Color: {results['color']}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            if results["shape"]:
+                name, contour = results["shape"]
+                cv2.drawContours(frame, [contour], -1, (0, 0, 255), 2)
+                cv2.putText(frame, f"Shape: {name}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            if results["house"]:
+                confidence, contour = results["house"]
+                cv2.drawContours(frame, [contour], -1, (0, 255, 0), 2)
+                cv2.putText(frame, f"HOUSE! ({confidence}%)", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+            profiler.end_frame(frame)
+            with profiler.stage("display"):
+                cv2.imshow("Bittle Perception", frame)
+                key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == OVERLAY_KEY:
+                profiler.toggle_overlay()
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# program_store.py
+# Named robot programs kept in one small binary file, so the shape scripts and the
+# color-card programmer share them instead of each holding its own list literal.
+#
+# File layout (little-endian):
+#   b'BTLP', version (u8)
+#   command count (u8), then each command: length (u8) + the exact bytes sent on the wire
+#   program count (u16), then each program:
+#     name length (u8) + UTF-8 name, step count (u16),
+#     one command index (u8) per step, one float32 duration per step
+# Commands are stored once and referenced by index, so a program costs 5 bytes a step.
+#
+#   python program_store.py                 # list the stored programs
+#   python program_store.py --import-shapes # store the sequences from the shape scripts
+import argparse
+import os
+import struct
+
+from command_timing import load_durations
+
+PROGRAMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs.bin')
+MAGIC = b'BTLP'
+VERSION = 1
+
+
+class Program:
+    """A stored sequence: its commands, the seconds to hold each one, and the wire bytes."""
+
+    def __init__(self, name, commands, seconds):
+        self.name = name
+        self.commands = tuple(commands)
+        self.seconds = tuple(seconds)
+        self.steps = list(zip(self.commands, self.seconds))  # Ready for BittleTransport.send_steps
+        self.wire = b''.join(self.commands)
+        self.total_seconds = sum(self.seconds)
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __repr__(self):
+        return f"Program({self.name!r}, {len(self)} steps, {self.total_seconds:.1f}s)"
+
+def encode_programs(programs):
+    """Packs Program objects into the binary file layout."""
+    table = {}
+    for program in programs:
+        for command in program.commands:
+            table.setdefault(command, len(table))
+    if len(table) > 255:
+        raise ValueError("too many distinct commands for one program file")
+
+    chunks = [MAGIC, struct.pack('<BB', VERSION, len(table))]
+    for command in table:
+        chunks.append(struct.pack('<B', len(command)) + command)
+    chunks.append(struct.pack('<H', len(programs)))
+    for program in programs:
+        name = program.name.encode('utf-8')
+        count = len(program)
+        chunks.append(struct.pack('<B', len(name)) + name + struct.pack('<H', count))
+        chunks.append(struct.pack(f'<{count}B', *(table[command] for command in program.commands)))
+        chunks.append(struct.pack(f'<{count}f', *program.seconds))
+    return b''.join(chunks)
+
+def decode_programs(data):
+    """Reads the binary file layout back into a {name: Program} dict."""
+    if data[:4] != MAGIC:
+        raise ValueError("not a Bittle program file")
+    version, command_count = struct.unpack_from('<BB', data, 4)
+    if version != VERSION:
+        raise ValueError(f"unsupported program file version {version}")
+
+    offset = 6
+    table = []
+    for _ in range(command_count):
+        length = data[offset]
+        table.append(data[offset + 1:offset + 1 + length])
+        offset += 1 + length
+
+    (program_count,) = struct.unpack_from('<H', data, offset)
+    offset += 2
+    programs = {}
+    for _ in range(program_count):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode('utf-8')
+        offset += 1 + length
+        (count,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        indices = struct.unpack_from(f'<{count}B', data, offset)
+        offset += count
+        seconds = struct.unpack_from(f'<{count}f', data, offset)
+        offset += 4 * count
+        programs[name] = Program(name, (table[i] for i in indices), (round(s, 3) for s in seconds))
+    return programs
+
+class ProgramStore:
+    """The program file loaded into memory, looked up by name and reloaded when it changes on disk."""
+
+    def __init__(self, path=PROGRAMS_FILE):
+        self.path = path
+        self.programs = {}
+        self._mtime = None
+
+    def __contains__(self, name):
+        return name in self.programs
+
+    def __getitem__(self, name):
+        return self.programs[name]
+
+    def names(self):
+        return list(self.programs)
+
+    def get(self, name, default=None):
+        return self.programs.get(name, default)
+
+    def add(self, name, sequence, durations=None):
+        """Stores a command sequence, timing each command from the duration table."""
+        durations = durations or load_durations()
+        program = Program(name, sequence, (durations.duration(command) for command in sequence))
+        self.programs[name] = program
+        return program
+
+    def add_steps(self, name, steps):
+        """Stores (command, seconds) steps with their timing as given."""
+        steps = list(steps)
+        program = Program(name, (command for command, _ in steps), (seconds for _, seconds in steps))
+        self.programs[name] = program
+        return program
+
+    def remove(self, name):
+        self.programs.pop(name, None)
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                self.programs = decode_programs(f.read())
+            self._mtime = os.stat(self.path).st_mtime_ns
+        return self
+
+    def save(self):
+        # Write to a temporary file first so a reloading reader never sees half a file
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(encode_programs(list(self.programs.values())))
+        os.replace(temporary, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def reload_if_changed(self):
+        """Reloads the file if another process changed it. Returns True when it did."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+def load_programs(path=PROGRAMS_FILE):
+    return ProgramStore(path).load()
+
+def main():
+    parser = argparse.ArgumentParser(description="List or import stored Bittle programs.")
+    parser.add_argument("--import-shapes", action="store_true",
+                        help="store the sequences defined in the shape scripts")
+    args = parser.parse_args()
+
+    store = load_programs()
+    if args.import_shapes:
+        import cali_tri
+        import shape_Bittle_test
+        import triangle_test
+
+        durations = load_durations()
+        store.add("square", cali_tri.SQUARE_SEQUENCE, durations)
+        store.add("triangle", cali_tri.TRIANGLE_SEQUENCE, durations)
+        store.add("your_triangle", triangle_test.YOUR_TRIANGLE_SEQUENCE, durations)
+        store.add("trot_square", shape_Bittle_test.SQUARE_SEQUENCE, durations)
+        store.save()
+        print(f"Saved {len(store.programs)} programs to {store.path} ({os.path.getsize(store.path)} bytes)")
+
+    for program in store.programs.values():
+        print(f"{program.name}: {len(program)} steps, {program.total_seconds:.1f}s",
+              [command.decode().strip() for command in program.commands])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# runtime.py
+# One long-running Bittle application. The camera, the serial transport, the duration
+# table and the program store are opened once; the behaviors of serial_core, test121,
+# house_detector and life_driver are modes that can be switched with a key press.
+#
+#   1 = color cards (serial_core)     2 = shape trigger (test121)
+#   3 = house detector                4 = keyboard teleop (life_driver)
+#   5 = stored programs (program_store)
+#   o = stage timings                 q = quit and rest
+import time
+
+import cv2
+import serial
+
+import serial_core
+from command_timing import EXECUTOR_WAITS, load_durations
+from frame_buffers import FrameBuffers
+from gait_planner import calibration_for, plan_polygon, polygon_from_contour
+from life_driver import KeyInput
+from perception import Perception, house, shape_trigger
+from program_store import load_programs
+from sequence_optimizer import optimize_sequence
+from stage_profiler import OVERLAY_KEY, StageProfiler
+from telemetry import TelemetryReader
+from transport import BALANCE, REST, BittleTransport
+
+# --- Bittle Configuration ---
+SERIAL_PORT = '/dev/tty.BittleB3_SSP'
+BAUD_RATE = 115200
+CAMERA = 0
+RELOAD_INTERVAL = 1.0  # Seconds between checks for edited programs
+DRAWING_SIZE_CM = 40  # As in test121
+USE_ESTIMATED_GAITS = False  # As in test121: plan with the measured calibration only
+
+
+# --- Color Cards ---
+# Checked in this order, the first card in view wins (same order and ranges as serial_core).
+# A card's ranges are OR-ed into one mask, so a red card split across hue 0/180 is still one blob.
+def _hsv_range(lower, upper):
+    return tuple(int(v) for v in lower), tuple(int(v) for v in upper)
+
+COLOR_CARDS = [
+    ("red", [_hsv_range(serial_core.lower_red_1, serial_core.upper_red_1),
+             _hsv_range(serial_core.lower_red_2, serial_core.upper_red_2)], b'kwkF\n', (0, 0, 255)),
+    ("yellow", [_hsv_range(serial_core.yellow_lower, serial_core.yellow_upper)], b'ktrR\n', (0, 255, 255)),
+    ("blue", [_hsv_range(serial_core.blue_lower, serial_core.blue_upper)], b'ktrL\n', (255, 0, 0)),
+    ("green", [_hsv_range(serial_core.green_lower, serial_core.green_upper)], b'kbkF\n', (0, 255, 0)),
+    ("white", [_hsv_range(serial_core.white_lower, serial_core.white_upper)], b'krest\n', (200, 200, 200)),
+]
+CARD_MIN_AREA = 500
+
+def color_card_command(perception):
+    """(card name, command, draw color) of the first card in view, or None."""
+    for name, ranges, command, color in COLOR_CARDS:
+        contours = perception.contours("in_ranges", tuple(ranges))
+        if contours and cv2.contourArea(max(contours, key=cv2.contourArea)) > CARD_MIN_AREA:
+            return name, command, color
+    return None
+
+class Mode:
+    """A behavior the runtime can switch to. Modes share everything the runtime holds."""
+
+    name = "idle"
+    consumers = {}  # Perception detectors this mode needs, registered while it is active
+
+    def enter(self, runtime):
+        pass
+
+    def exit(self, runtime):
+        pass
+
+    def frame(self, runtime, frame, results):
+        """Called with every camera frame and the results of this mode's detectors."""
+
+    def key(self, runtime, key):
+        """Called with keys the runtime doesn't handle itself."""
+
+class ColorMode(Mode):
+    """serial_core: red walks, yellow/blue trot right/left, green backs up, white rests."""
+
+    name = "color cards"
+    consumers = {"card": color_card_command}
+    COMMAND_INTERVAL = 1.0
+
+    def enter(self, runtime):
+        self.last_command_time = 0.0
+
+    def frame(self, runtime, frame, results):
+        if results["card"]:
+            name, command, color = results["card"]
+        else:
+            name, command, color = "standby", BALANCE, (128, 128, 128)
+        cv2.putText(frame, f"COMMAND: {name.upper()}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        if time.time() - self.last_command_time > self.COMMAND_INTERVAL:
+            runtime.transport.send(command)
+            self.last_command_time = time.time()
+
+class ShapeMode(Mode):
+    """test121: SPACE plans and draws the shape in the center box, 's' stops."""
+
+    name = "shape trigger"
+    consumers = {"shape": shape_trigger}
+
+    def enter(self, runtime):
+        self.shape = None
+        self.durations = runtime.durations.with_default(EXECUTOR_WAITS["test121"])
+
+    def frame(self, runtime, frame, results):
+        self.shape = results["shape"]
+        if self.shape:
+            cv2.drawContours(frame, [self.shape[1]], -1, (0, 0, 255), 2)
+        status = "DRAWING" if runtime.transport.busy() else "Press SPACE to draw"
+        cv2.putText(frame, f"{self.shape[0] if self.shape else 'No shape'} - {status}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    def key(self, runtime, key):
+        if key == ord(' ') and runtime.transport.busy():
+            print("Still drawing! Press 's' to stop first.")
+        elif key == ord(' ') and self.shape:
+            name, contour = self.shape
+            sequence, stats = plan_polygon(polygon_from_contour(contour, DRAWING_SIZE_CM),
+                                           calibration_for(USE_ESTIMATED_GAITS))
+            steps, _ = optimize_sequence(sequence, self.durations)
+            print(f">>> {name.upper()}: {len(steps)} steps, ~{stats['seconds']:.0f}s <<<")
+            runtime.transport.send_steps(steps)
+            runtime.transport.send(BALANCE)
+        elif key == ord(' '):
+            print("--- No shape in the box. ---")
+        elif key == ord('s'):
+            runtime.transport.stop(BALANCE)
+
+class HouseMode(Mode):
+    """house_detector: outlines the most house-like shape in the center box."""
+
+    name = "house detector"
+    consumers = {"house": house}
+
+    def frame(self, runtime, frame, results):
+        if results["house"]:
+            confidence, contour = results["house"]
+            cv2.drawContours(frame, [contour], -1, (0, 255, 0), 2)
+            cv2.putText(frame, f"HOUSE DETECTED! ({confidence}%)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        else:
+            cv2.putText(frame, "Scanning...", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+
+class TeleopMode(Mode):
+    """life_driver: w/a/d drive (hold to keep going), s stops."""
+
+    name = "teleop"
+
+    def enter(self, runtime):
+        self.keys = KeyInput(runtime.transport, runtime.durations.with_default(EXECUTOR_WAITS["life_driver"]))
+
+    def frame(self, runtime, frame, results):
+        self.keys.tick(time.monotonic())
+        cv2.putText(frame, f"w: Fwd, a: Left, d: Right, s: Stop - {self.keys.status}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    def key(self, runtime, key):
+        if key == ord('s'):
+            self.keys.stop()
+        else:
+            self.keys.key_event(key, time.monotonic())
+
+class ProgramMode(Mode):
+    """Runs programs from the program store: n picks the next one, SPACE runs it, s stops."""
+
+    name = "programs"
+
+    def enter(self, runtime):
+        self.selected = 0
+
+    def current(self, runtime):
+        # The store can be reloaded under us, so the selection is looked up every time
+        names = runtime.programs.names()
+        return runtime.programs[names[self.selected % len(names)]] if names else None
+
+    def frame(self, runtime, frame, results):
+        program = self.current(runtime)
+        status = "RUNNING" if runtime.transport.busy() else "SPACE to run, n for next"
+        text = f"{program} - {status}" if program else "No stored programs"
+        cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    def key(self, runtime, key):
+        program = self.current(runtime)
+        if key == ord('n'):
+            self.selected += 1
+        elif key == ord(' ') and runtime.transport.busy():
+            print("Still running! Press 's' to stop first.")
+        elif key == ord(' ') and program:
+            print(f">>> Running {program} <<<")
+            runtime.transport.send_steps(program.steps)
+            runtime.transport.send(BALANCE)
+        elif key == ord('s'):
+            runtime.transport.stop(BALANCE)
+
+MODES = {
+    ord('1'): ColorMode,
+    ord('2'): ShapeMode,
+    ord('3'): HouseMode,
+    ord('4'): TeleopMode,
+    ord('5'): ProgramMode,
+}
+
+class Runtime:
+    """Holds the shared camera, transport and configuration, and runs the active mode."""
+
+    def __init__(self, cap, transport, telemetry=None):
+        self.cap = cap
+        self.transport = transport
+        self.telemetry = telemetry
+        self.durations = load_durations()
+        self.programs = load_programs()
+        self.perception = Perception(FrameBuffers())
+        self.profiler = StageProfiler("runtime")
+        self.mode = Mode()
+
+    def switch(self, mode):
+        """Stops the robot, swaps the detectors and enters the new mode. Returns the seconds it took."""
+        start = time.perf_counter()
+        self.transport.stop(BALANCE)
+        self.mode.exit(self)
+        for name in self.mode.consumers:
+            self.perception.unregister(name)
+        self.mode = mode
+        for name, consumer in mode.consumers.items():
+            self.perception.register(name, consumer)
+        mode.enter(self)
+        return time.perf_counter() - start
+
+    def run(self, first_mode=ColorMode):
+        print(f"Mode switched to {first_mode.name} in {self.switch(first_mode()) * 1000:.2f} ms")
+        last_reload_check = time.time()
+        frame = None
+        while True:
+            ret, frame = self.cap.read(frame)
+            self.profiler.lap("capture")
+            if not ret:
+                break
+
+            results = self.perception.process(frame)
+            self.profiler.lap("detect")
+            self.mode.frame(self, frame, results)
+            self.profiler.lap("decide")
+
+            if time.time() - last_reload_check > RELOAD_INTERVAL:
+                last_reload_check = time.time()
+                if self.programs.reload_if_changed():
+                    print(f"Programs reloaded: {self.programs.names()}")
+
+            cv2.putText(frame, f"MODE: {self.mode.name} (1-5 to switch)", (10, frame.shape[0] - 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            self.profiler.end_frame(frame)
+            with self.profiler.stage("display"):
+                cv2.imshow("Bittle Runtime", frame)
+                key = cv2.waitKey(1) & 0xFF
+
+            if key == ord('q'):
+                break
+            elif key in MODES:
+                mode = MODES[key]()
+                print(f"Mode switched to {mode.name} in {self.switch(mode) * 1000:.2f} ms")
+            elif key == OVERLAY_KEY:
+                self.profiler.toggle_overlay()
+            elif key != 0xFF:
+                self.mode.key(self, key)
+
+def connect_to_bittle():
+    """Tries to connect to the serial port."""
+    try:
+        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
+        print(f"Successfully connected to Bittle on {SERIAL_PORT}")
+        time.sleep(2)
+        return ser
+    except serial.SerialException as e:
+        print(f"Error: Could not connect to {SERIAL_PORT}. Details: {e}")
+        return None
+
+def main():
+    bittle_serial = connect_to_bittle()
+    if not bittle_serial:
+        return
+
+    cap = cv2.VideoCapture(CAMERA)
+    if not cap.isOpened():
+        print("Error: Could not open camera.")
+        bittle_serial.close()
+        return
+
+    transport = BittleTransport(bittle_serial)
+    telemetry = TelemetryReader(bittle_serial, on_alert=lambda message: print(f"ALERT: {message}")).start()
+    try:
+        print("\n--- Bittle Runtime ---")
+        print("  1 = color cards, 2 = shape trigger, 3 = house detector, 4 = teleop, 5 = stored programs")
+        print("  o = stage timings, q = quit and rest")
+        Runtime(cap, transport, telemetry).run()
+    finally:
+        print("Shutting down...")
+        if bittle_serial.is_open:
+            transport.close(REST)
+            print("Serial port closed.")
+        telemetry.stop()
+        cap.release()
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
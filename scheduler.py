@@ -0,0 +1,61 @@
+# scheduler.py
+# Timers for the camera loops: instead of time.sleep() between robot commands,
+# a loop calls run_due() once per frame and the callbacks whose time has come run.
+# Capture, display and key handling never stop while a command is in flight.
+import heapq
+import itertools
+import time
+
+
+class Scheduler:
+    """Runs callbacks at a given time, polled from a loop that keeps processing frames."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._events = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+
+    def call_at(self, when, callback, *args):
+        """Schedules callback(*args) at clock time `when` and returns a handle for cancel()."""
+        handle = next(self._counter)
+        heapq.heappush(self._events, (when, handle, callback, args))
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        return self.call_at(self.clock(), callback, *args)
+
+    def cancel(self, handle):
+        self._cancelled.add(handle)
+
+    def cancel_all(self):
+        self._events.clear()
+        self._cancelled.clear()
+
+    def pending(self):
+        """True while any callback is still waiting to run."""
+        return any(handle not in self._cancelled for _, handle, _, _ in self._events)
+
+    def time_until_next(self):
+        """Seconds until the next callback is due (None when nothing is scheduled)."""
+        while self._events and self._events[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(self._events)[1])
+        if not self._events:
+            return None
+        return max(0.0, self._events[0][0] - self.clock())
+
+    def run_due(self):
+        """Runs every callback that is due. Returns how many ran."""
+        ran = 0
+        now = self.clock()
+        while self._events and self._events[0][0] <= now:
+            _, handle, callback, args = heapq.heappop(self._events)
+            if handle in self._cancelled:
+                self._cancelled.discard(handle)
+                continue
+            callback(*args)
+            ran += 1
+        return ran
@@ -0,0 +1,68 @@
+# sequence_optimizer.py
+# Shortens command sequences before they are sent to the Bittle:
+#  - repeats of the same gait become one continuous gait of computed duration
+#    (three kvtL sends become one kvtL left running for three turns' worth of time)
+#  - a BALANCE immediately followed by a gait is dropped, since the gait replaces it
+#    (the BALANCE between every move in YOUR_TRIANGLE_SEQUENCE); deliberate poses
+#    such as a sit or a rest are kept
+from command_timing import load_durations
+
+# --- Stance Commands ---
+# Postures rather than gaits: they hold the robot still instead of looping.
+STANCE_COMMANDS = {b'kbalance\n', b'krest\n', b'ksit\n', b'd\n'}
+# The neutral stance the programs put between moves; it has no effect when a gait follows
+NEUTRAL_STANCE = b'kbalance\n'
+
+
+def optimize_sequence(sequence, durations=None):
+    """
+    Turns a command list into (command, seconds) steps.
+    Returns (steps, seconds_saved) where seconds_saved is the predicted
+    difference against sending every command with its own full wait.
+    """
+    if durations is None:
+        durations = load_durations()
+
+    # A balance only matters if the robot is left standing in it
+    kept = [command for i, command in enumerate(sequence)
+            if command != NEUTRAL_STANCE or i == len(sequence) - 1
+            or sequence[i + 1] in STANCE_COMMANDS]
+
+    # Run-length encode what is left
+    steps = []
+    for command in kept:
+        if steps and steps[-1][0] == command:
+            if command not in STANCE_COMMANDS:
+                steps[-1][1] += durations.repeat_duration(command)
+        else:
+            steps.append([command, durations.duration(command)])
+    steps = [(command, seconds) for command, seconds in steps]
+
+    before = durations.total(sequence)
+    after = sum(seconds for _, seconds in steps)
+    return steps, before - after
+
+def describe(steps):
+    return [f"{command.decode().strip()} {seconds:.1f}s" for command, seconds in steps]
+
+def main():
+    import cali_tri
+    import shape_Bittle_test
+    import triangle_test
+
+    durations = load_durations()
+    programs = {
+        "cali_tri SQUARE": cali_tri.SQUARE_SEQUENCE,
+        "cali_tri TRIANGLE": cali_tri.TRIANGLE_SEQUENCE,
+        "triangle_test": triangle_test.YOUR_TRIANGLE_SEQUENCE,
+        "shape_Bittle_test SQUARE": shape_Bittle_test.SQUARE_SEQUENCE,
+    }
+    for name, sequence in programs.items():
+        steps, saved = optimize_sequence(sequence, durations)
+        before = durations.total(sequence)
+        print(f"{name}: {len(sequence)} sends / {before:.1f}s -> {len(steps)} sends / "
+              f"{before - saved:.1f}s (saves {saved:.1f}s)")
+        print("   ", describe(steps))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 import cv2
 import numpy as np
+import os
 import serial
 import time
 
+from color_parallel import StripeClassifier
+from command_timing import load_durations
+from flight_recorder import DUMP_KEY, FlightRecorder
+from frame_buffers import FrameBuffers
+from program_store import load_programs
+from scheduler import Scheduler
+from stage_profiler import OVERLAY_KEY, StageProfiler
+from transport import BittleTransport
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -24,6 +34,11 @@ COMMAND_MAP = {
     "blue": (b'ktrL\n', "Left"),
     "green": (b'kbkF\n', "Backwards")
 }
+COMMAND_NAMES = {command: name for command, name in COMMAND_MAP.values()}
+
+# --- Program Store ---
+SAVED_PROGRAM = "cards"  # 'p' saves the card program under this name, 'r' loads it back
+RELOAD_INTERVAL = 1.0  # Seconds between checks for edits to the program file
 
 def connect_to_bittle():
     """Tries to connect to the serial port."""
@@ -38,17 +53,23 @@ def connect_to_bittle():
         print(f"Error: Could not connect to {SERIAL_PORT}. Details: {e}")
         return None
 
-def get_dominant_color(hsv_frame):
+# Mask buffers reused from frame to frame by get_dominant_color
+MASK_BUFFERS = FrameBuffers()
+
+def get_dominant_color(hsv_frame, buffers=MASK_BUFFERS):
     """Finds the most prominent color in the frame."""
     max_area = 0
     dominant_color = None
+    mask_shape = hsv_frame.shape[:2]
 
     for color_name, (lower, upper) in COLORS.items():
         if color_name == "red_wrap": continue
         
-        mask = cv2.inRange(hsv_frame, lower, upper)
+        # One mask buffer is enough: each color's contours are found before the next is masked
+        mask = cv2.inRange(hsv_frame, lower, upper, dst=buffers.get("mask", mask_shape))
         if color_name == "red":
-            mask += cv2.inRange(hsv_frame, COLORS["red_wrap"][0], COLORS["red_wrap"][1])
+            wrap = cv2.inRange(hsv_frame, COLORS["red_wrap"][0], COLORS["red_wrap"][1], dst=buffers.get("red_wrap", mask_shape))
+            cv2.bitwise_or(mask, wrap, dst=mask)
         
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
@@ -62,6 +83,28 @@ def get_dominant_color(hsv_frame):
         return dominant_color
     return None
 
+# --- Parallel Masking ---
+# With more than one core, stripes of the frame are masked concurrently (see color_parallel.py)
+PARALLEL_MASKING = (os.cpu_count() or 1) > 1
+
+def make_color_classifier():
+    """A StripeClassifier for COLORS, with the red wrap range OR-ed into red."""
+    colors = {name: [bounds] for name, bounds in COLORS.items() if name != "red_wrap"}
+    colors["red"].append(COLORS["red_wrap"])
+    return StripeClassifier(colors)
+
+def dominant_color_of(areas):
+    """get_dominant_color for the {color: largest area} that StripeClassifier returns."""
+    max_area = 0
+    dominant_color = None
+    for color_name, area in areas.items():
+        if area > max_area:
+            max_area = area
+            dominant_color = color_name
+    if max_area > 500:
+        return dominant_color
+    return None
+
 def main():
     bittle_serial = connect_to_bittle()
     if not bittle_serial:
@@ -83,15 +126,56 @@ def main():
     
     ## NEW: Variable to store when the countdown starts ##
     countdown_start_time = 0
+    durations = load_durations(executor="sequential_test")
+    transport = BittleTransport(bittle_serial)
+    programs = load_programs()
+    step_seconds = []  # Hold time of each queued step, from the duration table or a stored program
+    last_reload_check = time.time()
+    profiler = StageProfiler("sequential_test")  # 'o' shows per-stage timings
+    recorder = FlightRecorder(name="sequential_test")  # 'f' dumps the last seconds to flights/
+    frame = None  # Reused by cap.read() every frame
+    classifier = make_color_classifier() if PARALLEL_MASKING else None
+
+    # Program steps are sent by timers, so frames keep flowing while the robot moves
+    scheduler = Scheduler()
+    execution = {"step": 0, "done": False}
+
+    def run_step(step):
+        """Sends one program step and schedules the next for when it has had time to finish."""
+        execution["step"] = step
+        if step < len(command_queue):
+            command_to_run = command_queue[step]
+            print(f"--> Executing: {command_to_run.decode().strip()}")
+            transport.send(command_to_run)
+            scheduler.call_later(step_seconds[step], run_step, step + 1)
+        else:
+            execution["done"] = True
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame = cap.read(frame)
+            profiler.lap("capture")
             if not ret:
                 break
+            recorder.record(frame, decision=currentState)  # Before anything is drawn on it
+            
+            scheduler.run_due()
+            profiler.lap("serial")
+
+            # Pick up programs saved or edited by other scripts without restarting
+            if time.time() - last_reload_check > RELOAD_INTERVAL:
+                last_reload_check = time.time()
+                if programs.reload_if_changed():
+                    print(f"Programs reloaded: {programs.names()}")
             
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            detected_color = get_dominant_color(hsv)
+            if classifier:
+                detected_color = dominant_color_of(classifier.largest_areas(frame))
+            else:
+                hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=MASK_BUFFERS.get("hsv", frame.shape))
+                profiler.lap("convert")
+                detected_color = get_dominant_color(hsv)
+            profiler.lap("mask+contours")
+            recorder.label("color", detected_color)
             
             if currentState == "LISTENING":
                 cv2.putText(frame, "MODE: PROGRAMMING", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -110,7 +194,9 @@ def main():
                     else:
                         command, name = COMMAND_MAP[detected_color]
                         command_queue.append(command)
+                        step_seconds.append(durations.duration(command))
                         program_names.append(name)
+                        recorder.label("command", name)
                         print(f"Added '{name}' to program. Queue has {len(command_queue)} steps.")
                         last_detection_time = time.time()
             
@@ -128,36 +214,73 @@ def main():
                 if time_remaining <= 0:
                     print("Countdown finished! Executing program...")
                     currentState = "EXECUTING"
+                    execution["step"] = 0
+                    execution["done"] = False
+                    scheduler.call_soon(run_step, 0)
 
                 # Optional: Allow canceling the countdown by moving the black object away
-                if detected_color != 'black':
+                elif detected_color != 'black':
                     print("Countdown cancelled! Returning to Programming mode.")
                     currentState = "LISTENING"
 
             elif currentState == "EXECUTING":
-                display_text = f"EXECUTING: {program_names}"
+                display_text = f"EXECUTING: {program_names[execution['step']:]}"
                 cv2.putText(frame, display_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
                 
-                if command_queue:
-                    command_to_run = command_queue.pop(0)
-                    program_names.pop(0)
-                    
-                    print(f"--> Executing: {command_to_run.decode().strip()}")
-                    bittle_serial.write(command_to_run)
-                    time.sleep(3.0)
-                else:
+                if execution["done"]:
                     print("--- Program Complete! Returning to Programming Mode. ---")
-                    bittle_serial.write(b'kbalance\n')
+                    transport.send(b'kbalance\n')
+                    command_queue.clear()
+                    step_seconds.clear()
+                    program_names.clear()
+                    currentState = "LISTENING"
+                
+                # Moving the black object away stops the program mid-step, keeping it for another run
+                elif detected_color != 'black':
+                    print("Execution cancelled! Returning to Programming mode.")
+                    recorder.trigger("cancelled")
+                    scheduler.cancel_all()
+                    latency = transport.stop(b'kbalance\n')
+                    print(f"Stop sent in {latency * 1000:.1f} ms.")
+                    last_detection_time = time.time()
                     currentState = "LISTENING"
 
-            cv2.imshow("Bittle Vision Control", frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            profiler.lap("decide")
+
+            profiler.end_frame(frame)
+            with profiler.stage("display"):
+                cv2.imshow("Bittle Vision Control", frame)
+                key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            elif key == OVERLAY_KEY:
+                profiler.toggle_overlay()
+            elif key == DUMP_KEY:
+                recorder.dump("manual")
+            elif key == ord('p') and currentState == "LISTENING" and command_queue:
+                program = programs.add(SAVED_PROGRAM, command_queue, durations)
+                programs.save()
+                print(f"Saved {program} to {programs.path}")
+            elif key == ord('r') and currentState == "LISTENING":
+                program = programs.get(SAVED_PROGRAM)
+                if program:
+                    # Show the black card to run it, as with a freshly programmed queue
+                    command_queue[:] = program.commands
+                    step_seconds[:] = program.seconds
+                    program_names[:] = [COMMAND_NAMES.get(command, command.decode().strip())
+                                        for command in program.commands]
+                    print(f"Loaded {program}. Show the black card to run it.")
+                else:
+                    print(f"No program named '{SAVED_PROGRAM}' saved yet.")
+    except Exception:
+        recorder.dump("exception")
+        raise
     finally:
+        if classifier:
+            classifier.close()
         print("Shutting down...")
-        if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(b'd\n')
-            bittle_serial.close()
+        if bittle_serial.is_open:
+            transport.close(b'd\n')
             print("Serial port closed.")
         cap.release()
         cv2.destroyAllWindows()
@@ -1,11 +1,19 @@
 import cv2
+import os
 import numpy as np
 import serial
 import time
 
+from color_parallel import StripeClassifier
+from frame_buffers import FrameBuffers
+from latency_trace import LatencyTracer
+from stage_profiler import OVERLAY_KEY, PROFILES_DIR, StageProfiler
+from telemetry import TelemetryReader
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
+CONNECT_REPLY_SECONDS = 1.0  # Time for the firmware to answer the kbalance sent on connect
 
 # --- Color Detection Configuration (HSV Color Space) ---
 ## ADDED: Definitions for all your colors ##
@@ -31,6 +39,11 @@ green_upper = np.array([80, 255, 255])
 white_lower = np.array([0, 0, 180])
 white_upper = np.array([180, 40, 255])
 
+# --- Parallel Masking ---
+# With more than one core, stripes of the frame are masked concurrently (see color_parallel.py)
+PARALLEL_MASKING = (os.cpu_count() or 1) > 1
+MIN_CARD_AREA = 500
+
 
 def connect_to_bittle():
     """Tries to connect to the serial port."""
@@ -39,12 +52,51 @@ def connect_to_bittle():
         print(f"Successfully connected to Bittle on {SERIAL_PORT}")
         time.sleep(2)
         ser.write(b'kbalance\n')
+        # Discard the answer to that kbalance: it was never traced and would be paired with the first write that is
+        time.sleep(CONNECT_REPLY_SECONDS)
+        ser.reset_input_buffer()
         print("Bittle standing by.")
         return ser
     except serial.SerialException as e:
         print(f"Error: Could not connect to {SERIAL_PORT}. Details: {e}")
         return None
 
+def find_card_areas(frame, buffers, profiler):
+    """Largest blob area of each color card, on this thread."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=buffers.get("hsv", frame.shape))
+    mask_shape = frame.shape[:2]
+    profiler.lap("convert")
+
+    ## ADDED: Masks and contours for all 5 colors ##
+    mask_r1 = cv2.inRange(hsv, lower_red_1, upper_red_1, dst=buffers.get("red_1", mask_shape))
+    mask_r2 = cv2.inRange(hsv, lower_red_2, upper_red_2, dst=buffers.get("red_2", mask_shape))
+    # OR rather than +: adding uint8 masks wraps 255 + 255 around to 254
+    red_mask = cv2.bitwise_or(mask_r1, mask_r2, dst=buffers.get("red", mask_shape))
+
+    yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper, dst=buffers.get("yellow", mask_shape))
+    blue_mask = cv2.inRange(hsv, blue_lower, blue_upper, dst=buffers.get("blue", mask_shape))
+    green_mask = cv2.inRange(hsv, green_lower, green_upper, dst=buffers.get("green", mask_shape))
+    white_mask = cv2.inRange(hsv, white_lower, white_upper, dst=buffers.get("white", mask_shape))
+    profiler.lap("mask")
+
+    red_contours, _ = cv2.findContours(red_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    yellow_contours, _ = cv2.findContours(yellow_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    blue_contours, _ = cv2.findContours(blue_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    green_contours, _ = cv2.findContours(green_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    white_contours, _ = cv2.findContours(white_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    profiler.lap("contours")
+
+    def largest(contours):
+        return max((cv2.contourArea(contour) for contour in contours), default=0.0)
+
+    return {
+        "red": largest(red_contours),
+        "yellow": largest(yellow_contours),
+        "blue": largest(blue_contours),
+        "green": largest(green_contours),
+        "white": largest(white_contours),
+    }
+
 def main():
     bittle_serial = connect_to_bittle()
     if not bittle_serial:
@@ -58,75 +110,93 @@ def main():
 
     last_command_time = time.time()
     command_interval = 1.0
+    profiler = StageProfiler("serial_core")  # 'o' shows per-stage timings
+    tracer = LatencyTracer()  # Card in front of the camera -> command on the wire -> robot answer
+    buffers = FrameBuffers()  # Images are written into these instead of being allocated every frame
+    frame = None
+    classifier = StripeClassifier({
+        "red": [(lower_red_1, upper_red_1), (lower_red_2, upper_red_2)],
+        "yellow": [(yellow_lower, yellow_upper)],
+        "blue": [(blue_lower, blue_upper)],
+        "green": [(green_lower, green_upper)],
+        "white": [(white_lower, white_upper)],
+    }) if PARALLEL_MASKING else None
+    # Firmware answers are read on their own thread; each one marks the oldest unanswered write of its token
+    telemetry = TelemetryReader(bittle_serial, on_ack=tracer.ack, on_alert=lambda message: print(f"ALERT: {message}")).start()
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame = cap.read(frame)
+            frame_id = tracer.capture()
+            profiler.lap("capture")
             if not ret:
                 break
             
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            
-            ## ADDED: Masks and contours for all 5 colors ##
-            mask_r1 = cv2.inRange(hsv, lower_red_1, upper_red_1)
-            mask_r2 = cv2.inRange(hsv, lower_red_2, upper_red_2)
-            red_mask = mask_r1 + mask_r2
-            
-            yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper)
-            blue_mask = cv2.inRange(hsv, blue_lower, blue_upper)
-            green_mask = cv2.inRange(hsv, green_lower, green_upper)
-            white_mask = cv2.inRange(hsv, white_lower, white_upper)
-            
-            red_contours, _ = cv2.findContours(red_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            yellow_contours, _ = cv2.findContours(yellow_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            blue_contours, _ = cv2.findContours(blue_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            green_contours, _ = cv2.findContours(green_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            white_contours, _ = cv2.findContours(white_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if classifier:
+                areas = classifier.largest_areas(frame)
+                profiler.lap("mask+contours")
+            else:
+                areas = find_card_areas(frame, buffers, profiler)
             
             command = None
             
             ## MODIFIED: The if/elif/else block now matches your new requirements ##
             # The order matters. The first color it finds in this list is the command it will use for that frame.
             
-            if red_contours and cv2.contourArea(max(red_contours, key=cv2.contourArea)) > 500:
+            if areas["red"] > MIN_CARD_AREA:
                 command = b'kwkF\n'  # Command: Walk Forward
                 cv2.putText(frame, "COMMAND: FORWARD (Red)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             
-            elif yellow_contours and cv2.contourArea(max(yellow_contours, key=cv2.contourArea)) > 500:
+            elif areas["yellow"] > MIN_CARD_AREA:
                 command = b'ktrR\n'  # Command: Trot Right
                 cv2.putText(frame, "COMMAND: RIGHT (Yellow)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
 
-            elif blue_contours and cv2.contourArea(max(blue_contours, key=cv2.contourArea)) > 500:
+            elif areas["blue"] > MIN_CARD_AREA:
                 command = b'ktrL\n'  # Command: Trot Left
                 cv2.putText(frame, "COMMAND: LEFT (Blue)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
             
-            elif green_contours and cv2.contourArea(max(green_contours, key=cv2.contourArea)) > 500:
+            elif areas["green"] > MIN_CARD_AREA:
                 command = b'kbkF\n'  # Command: Backward
                 cv2.putText(frame, "COMMAND: BACKWARDS (Green)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
             
-            elif white_contours and cv2.contourArea(max(white_contours, key=cv2.contourArea)) > 500:
+            elif areas["white"] > MIN_CARD_AREA:
                 command = b'krest\n' # Command: Rest
                 cv2.putText(frame, "COMMAND: REST (White)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (200, 200, 200), 2)
 
             else:
                 command = b'kbalance\n' # Command: Balance/Stop
                 cv2.putText(frame, "COMMAND: STANDBY", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (128, 128, 128), 2)
+            tracer.decide(frame_id)
+            profiler.lap("decide")
 
             # Send command to Bittle at a controlled rate
             if command and (time.time() - last_command_time > command_interval):
                 print(f"Sending command: {command.decode().strip()}")
+                telemetry.sent(command)  # Before the write, so a quick echo is still recognised
                 bittle_serial.write(command)
+                tracer.write(frame_id, command.decode().strip())
                 last_command_time = time.time()
+            profiler.lap("serial")
 
-            cv2.imshow("Bittle Vision Control", frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            profiler.end_frame(frame)
+            with profiler.stage("display"):
+                cv2.imshow("Bittle Vision Control", frame)
+                key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            elif key == OVERLAY_KEY:
+                profiler.toggle_overlay()
     finally:
+        if classifier:
+            classifier.close()
+        print(tracer.report())
+        tracer.save(os.path.join(PROFILES_DIR, 'serial_core_latency.json'))
         print("Shutting down...")
         if bittle_serial and bittle_serial.is_open:
             bittle_serial.write(b'd\n') # Command Bittle to rest
             bittle_serial.close()
             print("Serial port closed.")
+        telemetry.stop()  # After the port is closed, so its read returns right away
         cap.release()
         cv2.destroyAllWindows()
 
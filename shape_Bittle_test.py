@@ -3,6 +3,9 @@
 import serial
 import time
 
+from command_timing import load_durations
+from sequence_optimizer import optimize_sequence
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -33,20 +36,23 @@ def main():
     if not bittle_serial:
         return
 
+    durations = load_durations(executor="shape_Bittle_test")
+
     try:
         # Start the Bittle in a balanced state
         print("Bittle standing by...")
         bittle_serial.write(b'kbalance\n')
-        time.sleep(2)
+        time.sleep(durations.duration(b'kbalance\n'))
 
-        print(f"Executing your sequence ({len(SQUARE_SEQUENCE)} steps)...")
+        # Repeated steps and turns run as one continuous gait each
+        steps, saved = optimize_sequence(SQUARE_SEQUENCE, durations)
+        print(f"Executing your sequence ({len(steps)} steps, {saved:.1f}s faster than step by step)...")
         
         # Loop through each command in our sequence
-        for i, command in enumerate(SQUARE_SEQUENCE):
-            print(f"--> Sending step {i+1}: {command.decode().strip()}")
+        for i, (command, seconds) in enumerate(steps):
+            print(f"--> Sending step {i+1}: {command.decode().strip()} for {seconds:.1f}s")
             bittle_serial.write(command)
-            # You can adjust this time to make the actions smoother
-            time.sleep(2.0)
+            time.sleep(seconds)
         
         print("\n--- Sequence Complete! ---")
         
@@ -2,6 +2,8 @@
 import cv2
 import numpy as np
 
+from stage_profiler import OVERLAY_KEY, StageProfiler
+
 def get_shape_name(contour):
     """Analyzes a contour and returns the name of its shape."""
     # Approximate the contour to a polygon
@@ -28,9 +30,12 @@ if not cap.isOpened():
 
 print("\n--- Starting Simple Shape Finder ---")
 print("INFO: Hold a paper with a dark, clear shape INSIDE the green box.")
+print("INFO: Press 'o' for stage timings.")
+profiler = StageProfiler("shape_detector")
 
 while True:
     ret, frame = cap.read()
+    profiler.lap("capture")
     if not ret:
         break
         
@@ -51,13 +56,16 @@ while True:
     # --- We will now ONLY process the 'roi' image ---
     gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    profiler.lap("convert")
     
     # Use a simple threshold. This value might need tuning!
     # Try changing 127 to 100 or 150 if detection is not working.
     _, threshold = cv2.threshold(blurred, 127, 255, cv2.THRESH_BINARY_INV)
+    profiler.lap("threshold")
 
     # Find contours ONLY within the ROI
     contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    profiler.lap("contours")
     
     # Loop through all found contours
     for cnt in contours:
@@ -78,11 +86,16 @@ while True:
                     cy_main = cy_roi + y1
                     
                     cv2.putText(frame, shape_name, (cx_main - 40, cy_main), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    profiler.lap("classify")
 
-    cv2.imshow("Shape Finder", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    profiler.end_frame(frame)
+    with profiler.stage("display"):
+        cv2.imshow("Shape Finder", frame)
+        key = cv2.waitKey(1) & 0xFF
+    if key == ord('q'):
         break
+    elif key == OVERLAY_KEY:
+        profiler.toggle_overlay()
         
 cap.release()
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -2,6 +2,8 @@
 import cv2
 import numpy as np
 
+from stage_profiler import OVERLAY_KEY, StageProfiler
+
 def get_shape_name(contour):
     """
     Analyzes a contour and returns the name of a basic shape
@@ -48,9 +50,12 @@ if not cap.isOpened():
 
 print("\n--- Starting Shape Tuner ---")
 print("INFO: Watch the TERMINAL to see the circularity scores.")
+print("INFO: Press 'o' for stage timings.")
+profiler = StageProfiler("shape_test")
 
 while True:
     ret, frame = cap.read()
+    profiler.lap("capture")
     if not ret:
         break
         
@@ -65,9 +70,12 @@ while True:
     roi = frame[y1:y2, x1:x2]
 
     gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    profiler.lap("convert")
     _, threshold = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    profiler.lap("threshold")
 
     contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    profiler.lap("contours")
     
     for cnt in contours:
         if cv2.contourArea(cnt) > 500:
@@ -80,11 +88,16 @@ while True:
                     cy = int(M["m01"] / M["m00"]) + y1
                     
                     cv2.putText(frame, shape_name, (cx - 50, cy), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    profiler.lap("classify")
 
-    cv2.imshow("Shape Detector", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    profiler.end_frame(frame)
+    with profiler.stage("display"):
+        cv2.imshow("Shape Detector", frame)
+        key = cv2.waitKey(1) & 0xFF
+    if key == ord('q'):
         break
+    elif key == OVERLAY_KEY:
+        profiler.toggle_overlay()
         
 cap.release()
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,158 @@
+# stage_profiler.py
+# Where does a vision loop's frame time go? Each loop wraps its stages (capture, color
+# conversion, masking, contours, classification, decision, serial write, display) in
+# timers; the profiler keeps the last few hundred samples of each in preallocated arrays
+# and reports rolling FPS and p50/p99 per stage, on screen and as a JSON file.
+#
+#   profiler = StageProfiler("serial_core")
+#   while True:
+#       with profiler.stage("capture"):
+#           ret, frame = cap.read()
+#       hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+#       profiler.lap("convert")  # time since the last lap, stage or frame end
+#       ...
+#       profiler.end_frame(frame)  # draws the overlay (toggle with profiler.toggle_overlay) and saves snapshots
+import json
+import os
+import time
+
+import numpy as np
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+WINDOW = 256  # Samples kept per stage for the rolling percentiles
+SNAPSHOT_INTERVAL = 5.0  # Seconds between JSON snapshots
+OVERLAY_KEY = ord('o')  # The key the loops use to show or hide the overlay
+
+# Histogram over all samples: log-spaced bins from 10 us to 1 s, plus under/overflow
+HISTOGRAM_EDGES = np.logspace(-5, 0, 41)
+
+
+class _Stage:
+    """Timing storage for one stage. Also the context manager returned by StageProfiler.stage()."""
+
+    def __init__(self, name, profiler=None):
+        self.name = name
+        self.profiler = profiler
+        self.samples = np.zeros(WINDOW)
+        self.histogram = np.zeros(len(HISTOGRAM_EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self._start = 0.0
+
+    def add(self, seconds):
+        self.samples[self.count % WINDOW] = seconds
+        self.histogram[np.searchsorted(HISTOGRAM_EDGES, seconds)] += 1
+        self.count += 1
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.add(end - self._start)
+        self.profiler._lap_start = end
+        return False
+
+    def recent(self):
+        return self.samples[:min(self.count, WINDOW)]
+
+class StageProfiler:
+    """Per-stage timers for one vision loop."""
+
+    def __init__(self, name, snapshot_path=None, overlay=False):
+        self.name = name
+        self.snapshot_path = snapshot_path or os.path.join(PROFILES_DIR, f'{name}.json')
+        self.overlay = overlay
+        self.stages = {}
+        self._frames = _Stage("frame")
+        self._frame_start = time.perf_counter()
+        self._lap_start = self._frame_start
+        self._last_snapshot = time.monotonic()
+
+    def stage(self, name):
+        """Context manager timing one stage. The same object is reused every frame."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = _Stage(name, self)
+        return stage
+
+    def lap(self, name):
+        """Charges the time since the previous lap (or timed stage, or frame end) to a stage."""
+        now = time.perf_counter()
+        self.stage(name).add(now - self._lap_start)
+        self._lap_start = now
+
+    def timed(self, name):
+        """Decorator form of stage(), for functions that are a stage on their own."""
+        def decorate(func):
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorate
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+
+    def fps(self):
+        recent = self._frames.recent()
+        return 1.0 / recent.mean() if len(recent) and recent.mean() > 0 else 0.0
+
+    def summary(self):
+        """{stage: (p50 ms, p99 ms)} over the recent window."""
+        result = {}
+        for name, stage in self.stages.items():
+            recent = stage.recent()
+            if len(recent):
+                p50, p99 = np.percentile(recent, (50, 99)) * 1000
+                result[name] = (float(p50), float(p99))
+        return result
+
+    def snapshot(self):
+        return {
+            "loop": self.name,
+            "time": time.time(),
+            "frames": self._frames.count,
+            "fps": round(self.fps(), 2),
+            "stages": {
+                name: {
+                    "count": self.stages[name].count,
+                    "p50_ms": round(p50, 3),
+                    "p99_ms": round(p99, 3),
+                    "histogram": self.stages[name].histogram.tolist(),
+                }
+                for name, (p50, p99) in self.summary().items()
+            },
+            "histogram_edges_s": HISTOGRAM_EDGES.tolist(),
+        }
+
+    def save_snapshot(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temporary, self.snapshot_path)
+
+    def draw(self, frame):
+        """Writes FPS and p50/p99 per stage onto the frame."""
+        import cv2
+
+        lines = [f"{self.name}: {self.fps():.1f} FPS"]
+        lines += [f"{name}: {p50:.1f} / {p99:.1f} ms" for name, (p50, p99) in self.summary().items()]
+        y = frame.shape[0] - 15 * len(lines) - 10
+        for line in lines:
+            cv2.putText(frame, line, (frame.shape[1] - 260, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
+            y += 15
+
+    def end_frame(self, frame=None):
+        """Closes the frame: records its total time, draws the overlay if shown, saves a snapshot when due."""
+        now = time.perf_counter()
+        self._frames.add(now - self._frame_start)
+        self._frame_start = self._lap_start = now
+        if self.overlay and frame is not None:
+            self.draw(frame)
+        if time.monotonic() - self._last_snapshot > SNAPSHOT_INTERVAL:
+            self._last_snapshot = time.monotonic()
+            self.save_snapshot()
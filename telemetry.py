@@ -0,0 +1,169 @@
+# telemetry.py
+# Reads what the Bittle sends back. Until now nothing read the serial port, so acks,
+# IMU readings, battery voltage and error strings piled up in the OS buffer. A reader
+# thread parses every line: numbers go into preallocated NumPy rings that other threads
+# can snapshot without locks, acks and alerts go to callbacks.
+#
+#   telemetry = TelemetryReader(ser, on_ack=tracer.ack, on_alert=print)
+#   telemetry.start()
+#   ser.write(b'kwkF\n'); telemetry.sent(b'kwkF\n')  # its echo is then reported as an ack
+#   yaw, pitch, roll = telemetry.imu.latest()
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# --- Telemetry Configuration ---
+RING_SIZE = 1024  # Samples kept per channel
+LOW_BATTERY_VOLTS = 6.8  # The 2S pack is nominally 7.4 V
+TIPPED_DEGREES = 60.0  # Pitch or roll beyond this means the robot has fallen over
+SNAPSHOT_RETRIES = 8  # Copies a reader tries before settling for the rows the writer left intact
+
+# --- Line Formats ---
+# Whole lines as the firmware prints them; anything else is left as text.
+# IMU ('v'): yaw pitch roll, optionally labelled and followed by the accelerations,
+#   e.g. "ypr: -1.25 3.50 0.75" or "-1.25\t3.50\t0.75\t12\t-40\t8150"
+# Battery: "Voltage: 7.41", "Battery 7.4V", "Low power: 6.52V"
+NUMBER = r'(-?\d+(?:\.\d+)?)'
+IMU = re.compile(rf'(?:ypr:?\s*)?{NUMBER}[\s,]+{NUMBER}[\s,]+{NUMBER}(?:[\s,]+-?\d+(?:\.\d+)?){{0,3}}')
+BATTERY = re.compile(rf'(?i)(?:low )?(?:voltage|battery|power):?\s*{NUMBER}\s*V?')
+ERROR = re.compile(r'(?i)\b(?:error|fail\w*|low)\b')
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of numeric rows with timestamps, written by one thread.
+
+    Readers never lock: they copy the rows and retry if the writer lapped them meanwhile,
+    up to SNAPSHOT_RETRIES times, after which they get the newest rows that were intact.
+    """
+
+    def __init__(self, width, size=RING_SIZE):
+        self.size = size
+        self.values = np.zeros((size, width))
+        self.times = np.zeros(size)
+        self.count = 0  # Rows ever written; only the writer changes it, after the row is complete
+        self.started = 0  # Rows ever begun, including one being written right now
+
+    def append(self, row, when):
+        slot = self.count % self.size
+        self.started = self.count + 1
+        self.values[slot] = row
+        self.times[slot] = when
+        self.count += 1
+
+    def latest(self):
+        """The newest row, or None before the first one."""
+        count = self.count
+        if count == 0:
+            return None
+        return self.values[(count - 1) % self.size].copy()
+
+    def snapshot(self, n=None):
+        """
+        (times, values) of the last n rows (all kept rows by default), oldest first.
+        Fewer rows come back only if the writer kept lapping the copy on every retry.
+        """
+        for attempt in range(SNAPSHOT_RETRIES):
+            count = self.count
+            rows = min(count, self.size) if n is None else min(n, count, self.size)
+            index = np.arange(count - rows, count) % self.size
+            times, values = self.times[index], self.values[index]
+            # Row r goes into the slot of row r - size, so the copy is intact unless the writer
+            # began a row at or past count - rows + size while it was being taken
+            clobbered = self.started - self.size - (count - rows)
+            if clobbered <= 0:
+                return times, values
+        # Out of retries: drop the oldest rows, the ones the writer may have overwritten
+        keep = max(rows - clobbered, 0)
+        return times[rows - keep:], values[rows - keep:]
+
+class TelemetryReader:
+    """Background thread that parses the Bittle's serial output."""
+
+    def __init__(self, ser, on_ack=None, on_alert=None):
+        self.ser = ser
+        self.on_ack = on_ack  # callback(token) for each finished command, e.g. LatencyTracer.ack
+        self.on_alert = on_alert  # callback(message) for errors, a low battery or a fall
+        self.imu = RingBuffer(3)  # yaw, pitch, roll in degrees
+        self.battery = RingBuffer(1)  # volts
+        self.lines = 0
+        self.unparsed = 0
+        self._sent = deque(maxlen=RING_SIZE)  # Tokens written and not yet echoed, oldest first
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="bittle-telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def sent(self, command):
+        """Notes a command written to the port; the firmware echoes its token when it finishes."""
+        self._sent.append(command.decode().strip() if isinstance(command, bytes) else command)
+
+    def tipped(self):
+        """True when the latest IMU reading says the robot is on its side or back."""
+        latest = self.imu.latest()
+        return latest is not None and max(abs(latest[1]), abs(latest[2])) > TIPPED_DEGREES
+
+    def battery_low(self):
+        latest = self.battery.latest()
+        return latest is not None and latest[0] < LOW_BATTERY_VOLTS
+
+    def _alert(self, message):
+        if self.on_alert:
+            self.on_alert(message)
+
+    def parse(self, line, when=None):
+        """Files one line of firmware output. Returns its kind: ack, imu, battery, error or text."""
+        when = time.monotonic() if when is None else when
+        self.lines += 1
+
+        battery = BATTERY.fullmatch(line)
+        if battery:
+            volts = float(battery.group(1))
+            self.battery.append((volts,), when)
+            if volts < LOW_BATTERY_VOLTS:
+                self._alert(f"Low battery: {volts:.2f} V")
+            return "battery"
+
+        if ERROR.search(line):
+            self._alert(f"Firmware: {line}")
+            return "error"
+
+        imu = IMU.fullmatch(line)
+        if imu:
+            was_tipped = self.tipped()
+            self.imu.append([float(n) for n in imu.groups()], when)
+            if self.tipped() and not was_tipped:
+                self._alert("Robot has tipped over")
+            return "imu"
+
+        # Only the echo of a token that was sent is an ack, not any word the firmware prints
+        if line in self._sent:
+            self._sent.remove(line)
+            if self.on_ack:
+                self.on_ack(line)
+            return "ack"
+
+        self.unparsed += 1
+        return "text"
+
+    def _run(self):
+        while self._running and self.ser.is_open:
+            try:
+                raw = self.ser.readline()  # Returns empty after the port's read timeout
+            except (OSError, TypeError):
+                break  # Port closed underneath us
+            line = raw.decode(errors='replace').strip()
+            if line:
+                self.parse(line)
@@ -0,0 +1,153 @@
+# teleop_recorder.py
+# Records every command life_driver sends, so a sequence found by driving the robot
+# doesn't have to be retyped by hand, and plays recorded sessions back.
+#
+# Session file layout (little-endian): b'BTLS', version (u8), then one record per
+# command: seconds since the session started (float64), length (u8), command bytes.
+#
+#   python teleop_recorder.py sessions/session_20250101_120000.bin                  # show it
+#   python teleop_recorder.py SESSION --mode compressed --export your_triangle      # save as a program
+#   python teleop_recorder.py SESSION --mode fast --speed 2 --play                  # replay on the robot
+import argparse
+import os
+import struct
+import threading
+import time
+
+from calibration import COMMAND_MOTION
+from command_timing import load_durations
+
+SESSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions')
+MAGIC = b'BTLS'
+VERSION = 1
+RECORD = struct.Struct('<dB')
+
+# --- Replay Modes ---
+ORIGINAL = "original"  # The gaps as they were driven
+FAST = "fast"  # Gaps divided by the speed factor, but never below the command's measured duration
+COMPRESSED = "compressed"  # Idle time after stance commands cut to the command's duration
+REPLAY_MODES = (ORIGINAL, FAST, COMPRESSED)
+
+
+class SessionRecorder:
+    """Appends (time, command) records to a session file. Safe to call from the transport's writer thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._start = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + struct.pack('<B', VERSION))
+
+    @classmethod
+    def start(cls, directory=SESSIONS_DIR):
+        """Opens a new session file named after the current time."""
+        return cls(os.path.join(directory, time.strftime('session_%Y%m%d_%H%M%S.bin')))
+
+    def record(self, command, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._start is None:
+                self._start = now
+            self._file.write(RECORD.pack(now - self._start, len(command)) + command)
+            self._file.flush()  # A crash should not lose the session
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def load_session(path):
+    """Reads a session file into a list of (seconds, command)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError("not a Bittle session file")
+    if data[4] != VERSION:
+        raise ValueError(f"unsupported session file version {data[4]}")
+
+    events = []
+    offset = 5
+    while offset + RECORD.size <= len(data):
+        seconds, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        command = data[offset:offset + length]
+        if len(command) < length:
+            break  # Cut off mid-record by a crash
+        events.append((seconds, command))
+        offset += length
+    return events
+
+def replay_steps(events, mode=ORIGINAL, speed=2.0, durations=None):
+    """
+    Turns recorded events into (command, seconds) steps for BittleTransport.send_steps.
+
+    Gaits keep running until the next command, so the gap after a gait is motion and is
+    kept in COMPRESSED mode; the gap after a stance command (kbalance, d) is idle time.
+    The last command is held for its measured duration.
+    """
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"unknown replay mode {mode!r}")
+    durations = durations or load_durations()
+
+    steps = []
+    for i, (seconds, command) in enumerate(events):
+        duration = durations.duration(command)
+        gap = events[i + 1][0] - seconds if i + 1 < len(events) else duration
+        if mode == FAST:
+            # Never shorter than a command needs to finish, never longer than it was recorded
+            gap = max(gap / speed, min(gap, duration))
+        elif mode == COMPRESSED and command not in COMMAND_MOTION:
+            gap = min(gap, duration)
+        steps.append((command, round(gap, 3)))
+    return steps
+
+def main():
+    parser = argparse.ArgumentParser(description="Show, export or replay a recorded teleop session.")
+    parser.add_argument("session", help="session file written by life_driver")
+    parser.add_argument("--mode", choices=REPLAY_MODES, default=ORIGINAL)
+    parser.add_argument("--speed", type=float, default=2.0, help="speed-up factor for --mode fast")
+    parser.add_argument("--export", metavar="NAME", help="save the replay steps to the program store")
+    parser.add_argument("--play", action="store_true", help="replay the session on the robot")
+    parser.add_argument("--port", default='/dev/tty.BittleB3_SSP')
+    args = parser.parse_args()
+
+    events = load_session(args.session)
+    steps = replay_steps(events, args.mode, args.speed)
+    recorded = events[-1][0] - events[0][0] if events else 0.0
+    print(f"{len(events)} commands over {recorded:.1f}s -> {sum(s for _, s in steps):.1f}s in {args.mode} mode")
+    for command, seconds in steps:
+        print(f"    {command.decode().strip()} {seconds:.1f}s")
+
+    if args.export:
+        from program_store import load_programs
+
+        store = load_programs()
+        program = store.add_steps(args.export, steps)
+        store.save()
+        print(f"Saved {program} to {store.path}")
+
+    if args.play:
+        import serial
+
+        from transport import BittleTransport
+
+        try:
+            ser = serial.Serial(args.port, 115200, timeout=1)
+        except serial.SerialException as e:
+            print(f"Error: Could not connect to {args.port}. Details: {e}")
+            return
+        time.sleep(2)
+        transport = BittleTransport(ser)
+        try:
+            transport.send_steps(steps)
+            transport.wait_idle()
+        finally:
+            transport.close()
+
+if __name__ == "__main__":
+    main()
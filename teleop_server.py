@@ -0,0 +1,195 @@
+# teleop_server.py
+# Lets any local program drive the Bittle (a controller bridge, a web UI, a test script)
+# by sending small binary frames to a socket, instead of key presses in an OpenCV window.
+# Only localhost or a Unix socket is served: the robot should not be reachable from the network.
+#
+# Request frame (little-endian): op (u8), command length (u8), sequence number (u16),
+#   hold in milliseconds (u16), then the command bytes.
+# Reply frame: op (u8), status (u8), sequence number (u16), microseconds the server
+#   took from reading the frame to handing the command to the transport (u32).
+#
+#   python teleop_server.py --port 8765              # or --unix /tmp/bittle.sock
+#   python teleop_server.py --simulate --bench 2000  # measure round trips without a robot
+import argparse
+import asyncio
+import socket
+import struct
+import time
+
+from transport import BALANCE, REST, BittleTransport
+
+# --- Server Configuration ---
+SERIAL_PORT = '/dev/tty.BittleB3_SSP'
+BAUD_RATE = 115200
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_PENDING = 2  # Motion frames beyond this many waiting commands are refused, not queued
+STOP_COMMANDS = (BALANCE, REST, b'krest\n')  # The only commands allowed to jump the queue
+
+REQUEST = struct.Struct('<BBHH')
+REPLY = struct.Struct('<BBHI')
+
+# --- Operations ---
+OP_SEND = 1  # Queue a motion command
+OP_STOP = 2  # Preempt everything and send a stop command (balance if empty)
+OP_PING = 3  # Round trip only, nothing is sent to the robot
+
+# --- Reply Status ---
+STATUS_OK = 0
+STATUS_BUSY = 1
+STATUS_BAD = 2
+
+
+def encode_request(op, seq, command=b'', hold=0.0):
+    return REQUEST.pack(op, len(command), seq & 0xFFFF, min(int(hold * 1000), 0xFFFF)) + command
+
+async def handle_frame(transport, op, command, hold):
+    """Applies one request to the transport and returns its status."""
+    if op == OP_PING:
+        return STATUS_OK
+    if op == OP_STOP:
+        command = command or BALANCE
+        if command not in STOP_COMMANDS:
+            return STATUS_BAD
+        # stop() writes to the port itself; off the event loop so other clients aren't stalled
+        await asyncio.get_running_loop().run_in_executor(None, transport.stop, command)
+        return STATUS_OK
+    if op == OP_SEND and command.endswith(b'\n'):
+        if transport.pending() >= MAX_PENDING:
+            return STATUS_BUSY
+        transport.send(command, hold)
+        return STATUS_OK
+    return STATUS_BAD
+
+async def serve_client(transport, reader, writer):
+    peer = writer.get_extra_info('peername') or 'unix socket'
+    print(f"Client connected: {peer}")
+    try:
+        while True:
+            header = await reader.readexactly(REQUEST.size)
+            start = time.perf_counter()
+            op, length, seq, hold_ms = REQUEST.unpack(header)
+            command = await reader.readexactly(length) if length else b''
+            status = await handle_frame(transport, op, command, hold_ms / 1000)
+            micros = int((time.perf_counter() - start) * 1e6)
+            writer.write(REPLY.pack(op, status, seq, micros))
+            await writer.drain()  # Back-pressure: don't pile replies up for a client that stopped reading
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        print(f"Client disconnected: {peer}")
+        writer.close()
+
+async def serve(transport, host=HOST, port=PORT, unix_path=None):
+    handler = lambda reader, writer: serve_client(transport, reader, writer)
+    if unix_path:
+        server = await asyncio.start_unix_server(handler, path=unix_path)
+        print(f"Listening on {unix_path}")
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"Listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+class TeleopClient:
+    """Blocking client for scripts and tests. Each call returns (status, round trip s, server s)."""
+
+    def __init__(self, host=HOST, port=PORT, unix_path=None):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.seq = 0
+
+    def request(self, op, command=b'', hold=0.0):
+        self.seq = (self.seq + 1) & 0xFFFF
+        start = time.perf_counter()
+        self.sock.sendall(encode_request(op, self.seq, command, hold))
+        reply = b''
+        while len(reply) < REPLY.size:
+            chunk = self.sock.recv(REPLY.size - len(reply))
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            reply += chunk
+        rtt = time.perf_counter() - start
+        _, status, _, micros = REPLY.unpack(reply)
+        return status, rtt, micros / 1e6
+
+    def send(self, command, hold=0.0):
+        return self.request(OP_SEND, command, hold)
+
+    def stop(self, command=BALANCE):
+        return self.request(OP_STOP, command)
+
+    def ping(self):
+        return self.request(OP_PING)
+
+    def close(self):
+        self.sock.close()
+
+class SimulatedSerial:
+    """Stands in for the Bluetooth port when there is no robot: writes are dropped."""
+
+    is_open = True
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+def bench(count, host=HOST, port=PORT, unix_path=None):
+    """Sends `count` stop frames and prints the round-trip latency percentiles."""
+    client = TeleopClient(host, port, unix_path)
+    start = time.perf_counter()
+    rtts = sorted(client.stop()[1] for _ in range(count))
+    elapsed = time.perf_counter() - start
+    client.close()
+    print(f"{count} commands in {elapsed:.2f}s ({count / elapsed:.0f}/s), round trip "
+          f"p50 {rtts[len(rtts) // 2] * 1000:.2f} ms, p99 {rtts[int(len(rtts) * 0.99)] * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Bittle commands over a local socket.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="serve on a Unix socket instead of localhost TCP")
+    parser.add_argument("--serial", default=SERIAL_PORT)
+    parser.add_argument("--simulate", action="store_true", help="run without a robot")
+    parser.add_argument("--bench", type=int, metavar="N", help="start the server and time N round trips against it")
+    args = parser.parse_args()
+
+    if args.simulate:
+        ser = SimulatedSerial()
+    else:
+        import serial
+
+        try:
+            ser = serial.Serial(args.serial, BAUD_RATE, timeout=1)
+        except serial.SerialException as e:
+            print(f"Error: Could not connect to {args.serial}. Details: {e}")
+            return
+        time.sleep(2)
+
+    transport = BittleTransport(ser)
+    try:
+        if args.bench:
+            import threading
+
+            thread = threading.Thread(target=asyncio.run, args=(serve(transport, HOST, args.port, args.unix),), daemon=True)
+            thread.start()
+            time.sleep(0.5)
+            bench(args.bench, HOST, args.port, args.unix)
+        else:
+            asyncio.run(serve(transport, HOST, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transport.close(REST)
+        print("Serial port closed.")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ import numpy as np
 import serial
 import time
 
+from command_timing import load_durations
+from gait_planner import calibration_for, plan_polygon, polygon_from_contour
+from sequence_optimizer import optimize_sequence
+from stage_profiler import OVERLAY_KEY, StageProfiler
+from transport import BittleTransport
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -17,6 +23,17 @@ TURN_LEFT = b'kvtL\n'
 BALANCE = b'kbalance\n'
 REST = b'd\n'
 
+# Measured per-command durations (see command_timing.py)
+DURATIONS = load_durations(executor="test121")
+
+# --- Planner Settings ---
+# When True, any detected polygon is planned from its own contour instead of
+# running the fixed triangle program below.
+USE_PLANNER = True
+# The trot turns in calibration.py are estimates; only plan with them once they are measured
+USE_ESTIMATED_GAITS = False
+DRAWING_SIZE_CM = 40  # The larger side of the drawn shape
+
 # --- YOUR CALIBRATED TRIANGLE PROGRAM ---
 # This is the exact sequence you discovered using the live driver.
 YOUR_TRIANGLE_SEQUENCE = [
@@ -78,15 +95,14 @@ def connect_to_bittle():
         print(f"Error: Could not connect to {SERIAL_PORT}. Details: {e}")
         return None
 
-def execute_drawing(bittle_serial, sequence):
-    """Function to make the Bittle draw a sequence."""
-    print(f"Executing sequence ({len(sequence)} steps)...")
-    for i, command in enumerate(sequence):
-        print(f"--> Sending step {i+1}: {command.decode().strip()}")
-        bittle_serial.write(command)
-        time.sleep(2.0)
-    print("\n--- Drawing Complete! ---")
-    bittle_serial.write(BALANCE)
+def execute_drawing(transport, sequence):
+    """Function to make the Bittle draw a sequence. Returns right away; 's' stops it."""
+    steps, saved = optimize_sequence(sequence, DURATIONS)
+    print(f"Executing sequence ({len(steps)} steps, {saved:.1f}s faster than step by step)...")
+    for i, (command, seconds) in enumerate(steps):
+        print(f"--> Queued step {i+1}: {command.decode().strip()} for {seconds:.1f}s")
+    transport.send_steps(steps)
+    transport.send(BALANCE)
 
 def main():
     bittle_serial = connect_to_bittle()
@@ -98,55 +114,94 @@ def main():
         if bittle_serial: bittle_serial.close()
         return
 
-    print("\n--- Vision-Triggered Triangle Drawer ---")
-    print("INFO: Position a triangle in the green box.")
+    transport = BittleTransport(bittle_serial)
+    profiler = StageProfiler("test121")
+    prompt = "Position Shape, Press SPACE" if USE_PLANNER else "Position Triangle, Press SPACE"
+
+    print("\n--- Vision-Triggered Shape Drawer ---")
+    print(f"INFO: Position {'a shape' if USE_PLANNER else 'a triangle'} in the green box.")
     print("INFO: Press the SPACEBAR to detect and draw.")
+    print("INFO: Press 's' to stop the robot immediately.")
+    print("INFO: Press 'o' for stage timings.")
     print("INFO: Press 'q' to quit.")
 
-    while True:
-        ret, frame = cap.read()
-        if not ret: break
-
-        # Define and draw the Region of Interest (ROI)
-        frame_height, frame_width, _ = frame.shape
-        roi_size = 400
-        x1 = (frame_width - roi_size) // 2
-        y1 = (frame_height - roi_size) // 2
-        cv2.rectangle(frame, (x1, y1), (x1 + roi_size, y1 + roi_size), (0, 255, 0), 2)
-        cv2.putText(frame, "Position Triangle, Press SPACE", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    try:
+        while True:
+            ret, frame = cap.read()
+            profiler.lap("capture")
+            if not ret: break
+
+            # Define and draw the Region of Interest (ROI)
+            frame_height, frame_width, _ = frame.shape
+            roi_size = 400
+            x1 = (frame_width - roi_size) // 2
+            y1 = (frame_height - roi_size) // 2
+            cv2.rectangle(frame, (x1, y1), (x1 + roi_size, y1 + roi_size), (0, 255, 0), 2)
+            cv2.putText(frame, prompt, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
-        cv2.imshow("Bittle Shape Trigger", frame)
-
-        key = cv2.waitKey(1) & 0xFF
-
-        # --- Wait for user to press the spacebar ---
-        if key == ord(' '):
-            print("\nSpacebar pressed! Analyzing frame for a triangle...")
+            # The frame is closed after the spacebar analysis below, so its laps count for this
+            # frame; the overlay goes on a copy so it can't leak into the analysed pixels
+            shown = frame
+            if profiler.overlay:
+                shown = frame.copy()
+                profiler.draw(shown)
+            with profiler.stage("display"):
+                cv2.imshow("Bittle Shape Trigger", shown)
+                key = cv2.waitKey(1) & 0xFF
+
+            # --- Wait for user to press the spacebar ---
+            if key == ord(' ') and transport.busy():
+                print("\nStill drawing! Press 's' to stop first.")
+
+            elif key == ord(' '):
+                print(f"\nSpacebar pressed! Analyzing frame for {'a shape' if USE_PLANNER else 'a triangle'}...")
             
-            roi = frame[y1:y1+roi_size, x1:x1+roi_size]
-            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-            _, threshold = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
-            contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                roi = frame[y1:y1+roi_size, x1:x1+roi_size]
+                gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+                profiler.lap("convert")
+                _, threshold = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+                profiler.lap("threshold")
+                contours, _ = cv2.findContours(threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                profiler.lap("contours")
             
-            found_triangle = False
-            for cnt in contours:
-                if get_shape_name(cnt) == "Triangle":
-                    print(">>> TRIANGLE FOUND! Starting program. <<<")
-                    execute_drawing(bittle_serial, YOUR_TRIANGLE_SEQUENCE)
-                    found_triangle = True
-                    break 
+                found_triangle = False
+                for cnt in contours:
+                    shape_name = get_shape_name(cnt)
+                    if USE_PLANNER and shape_name:
+                        sequence, stats = plan_polygon(polygon_from_contour(cnt, DRAWING_SIZE_CM),
+                                                       calibration_for(USE_ESTIMATED_GAITS))
+                        print(f">>> {shape_name.upper()} FOUND! Planned {len(sequence)} steps, "
+                              f"~{stats['seconds']:.0f}s, max error {stats['max_error']:.1f} cm. <<<")
+                        execute_drawing(transport, sequence)
+                        found_triangle = True
+                        break
+                    if shape_name == "Triangle":
+                        print(">>> TRIANGLE FOUND! Starting program. <<<")
+                        execute_drawing(transport, YOUR_TRIANGLE_SEQUENCE)
+                        found_triangle = True
+                        break 
             
-            if not found_triangle:
-                print("--- No triangle found in that snapshot. Please adjust and try again. ---")
+                profiler.lap("classify")  # Includes planning and queueing the drawing
+                if not found_triangle:
+                    print("--- No shape found in that snapshot. Please adjust and try again. ---")
+
+            elif key == ord('s'):
+                with profiler.stage("serial"):
+                    latency = transport.stop(BALANCE)
+                print(f"STOP! Pending steps cancelled, balance sent in {latency * 1000:.1f} ms.")
+
+            elif key == OVERLAY_KEY:
+                profiler.toggle_overlay()
+
+            elif key == ord('q'):
+                break
 
-        elif key == ord('q'):
-            break
+            profiler.end_frame()
             
     finally:
         print("Shutting down...")
-        if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(REST)
-            bittle_serial.close()
+        if bittle_serial.is_open:
+            transport.close(REST)
         cap.release()
         cv2.destroyAllWindows()
 
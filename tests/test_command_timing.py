@@ -0,0 +1,35 @@
+from calibration import COMMAND_MOTION
+from command_timing import EXECUTOR_WAITS, GAIT_STARTUP_SECONDS, load_durations, measure_gait
+
+
+class EchoSerial:
+    """Echoes each command straight back, as the firmware does once it has started it."""
+
+    def __init__(self):
+        self.written = []
+        self.lines = []
+
+    def reset_input_buffer(self):
+        self.lines = []
+
+    def write(self, data):
+        self.written.append(data)
+        self.lines.append(data)
+
+    def readline(self):
+        return self.lines.pop(0) if self.lines else b''
+
+
+def test_gait_time_is_its_startup_plus_the_calibrated_walk():
+    ser = EchoSerial()
+    samples = measure_gait(ser, b'kwkF\n', repeats=2)
+    walking = COMMAND_MOTION[b'kwkF\n'][2] - GAIT_STARTUP_SECONDS
+    assert len(samples) == 2
+    assert all(walking <= s < walking + 0.5 for s in samples)
+    assert ser.written == [b'kwkF\n', b'kbalance\n'] * 2
+
+
+def test_executor_keeps_its_old_wait_for_unmeasured_commands(tmp_path):
+    path = str(tmp_path / "durations.json")
+    assert load_durations(path, executor="sequential_test").duration(b'kwkF\n') == EXECUTOR_WAITS["sequential_test"]
+    assert load_durations(path).duration(b'kwkF\n') == COMMAND_MOTION[b'kwkF\n'][2]
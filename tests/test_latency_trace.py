@@ -0,0 +1,36 @@
+import threading
+
+from latency_trace import LatencyTracer
+
+
+def test_acks_pair_with_the_oldest_write_of_their_token():
+    tracer = LatencyTracer(size=8)
+    walk = tracer.capture()
+    tracer.write(walk, "kwkF")
+    balance = tracer.capture()
+    tracer.write(balance, "kbalance")
+    assert tracer.ack("kbalance") == balance
+    assert tracer.ack("ready") is None
+    assert tracer.ack("kwkF") == walk
+    assert tracer.ack("kwkF") is None
+
+def test_acks_from_another_thread_while_writing():
+    tracer = LatencyTracer()
+    errors = []
+    done = threading.Event()
+
+    def acker():
+        try:
+            while not done.is_set():
+                tracer.ack("kbalance")
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=acker)
+    thread.start()
+    for _ in range(20000):
+        tracer.write(tracer.capture(), "kwkF")  # Never acked, so the deque stays long
+        tracer.write(tracer.capture(), "kbalance")
+    done.set()
+    thread.join()
+    assert not errors
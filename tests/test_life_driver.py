@@ -0,0 +1,49 @@
+from life_driver import BALANCE, FIRST_REPEAT_DELAY, KeyInput, TURN_LEFT, WALK_FORWARD
+
+
+class FakeTransport:
+    def __init__(self):
+        self.log = []
+
+    def pending(self):
+        return 0
+
+    def send(self, command, seconds):
+        self.log.append(("send", command))
+
+    def stop(self, command):
+        self.log.append(("stop", command))
+        return 0.0
+
+class FixedDurations:
+    def duration(self, command):
+        return 0.5
+
+def run(events, until):
+    """Feeds (time, key) events and ticks every 30 ms like the driver loop."""
+    transport = FakeTransport()
+    keys = KeyInput(transport, FixedDurations())
+    events = sorted(events)
+    now = 0.0
+    while now <= until:
+        while events and events[0][0] <= now:
+            keys.key_event(ord(events.pop(0)[1]), now)
+        keys.tick(now)
+        now = round(now + 0.03, 3)
+    return transport.log
+
+def test_double_tap_sends_two_commands():
+    assert run([(0.0, 'a'), (0.39, 'a')], until=2.0) == [("send", TURN_LEFT), ("send", TURN_LEFT)]
+
+def test_held_key_sends_one_command_then_balances_on_release():
+    # First repeat after the OS delay, then every 33 ms for a second
+    events = [(0.0, 'w')] + [(round(0.51 + 0.033 * i, 3), 'w') for i in range(30)]
+    assert run(events, until=3.0) == [("send", WALK_FORWARD), ("stop", BALANCE)]
+
+def test_other_key_after_a_tap_is_sent_too():
+    assert run([(0.0, 'a'), (0.2, 'a'), (0.25, 'w')], until=2.0)[:3] == [
+        ("send", TURN_LEFT), ("send", TURN_LEFT), ("send", WALK_FORWARD)]
+
+def test_slow_taps_are_separate():
+    log = run([(0.0, 'w'), (FIRST_REPEAT_DELAY + 0.1, 'w')], until=2.0)
+    assert log == [("send", WALK_FORWARD), ("send", WALK_FORWARD)]
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pytest
+
+from path_compiler import TURN_LEFT, TURN_RIGHT, WALK_FORWARD, compile_paths, normalize_angle, program_commands
+
+
+def replay(commands, pose, stride, turn_step):
+    """Where the commands take a robot that turns and walks exactly as calibrated."""
+    x, y, heading = pose
+    for command in commands:
+        if command == TURN_LEFT:
+            heading += turn_step
+        elif command == TURN_RIGHT:
+            heading -= turn_step
+        else:
+            x += stride * math.cos(math.radians(heading))
+            y += stride * math.sin(math.radians(heading))
+    return x, y, heading
+
+def test_square_compiles_to_exact_walks_and_turns():
+    square = [(0, 0), (0, 2), (-2, 2), (-2, 0), (0, 0)]
+    segments, stats = compile_paths([square], stride=1.0, turn_step=90.0)
+    side = [WALK_FORWARD] * 2
+    assert segments == [("draw", side + [TURN_LEFT] + side + [TURN_LEFT] + side + [TURN_LEFT] + side)]
+    assert stats["max_error"] == pytest.approx(0.0, abs=1e-9)
+
+def test_moves_between_paths_are_travel_segments():
+    segments, stats = compile_paths([[(0, 0), (0, 3)], [(3, 3), (3, 0)]], stride=1.0, turn_step=90.0)
+    assert [kind for kind, _ in segments] == ["draw", "travel", "draw"]
+    assert segments[1][1] == [TURN_RIGHT] + [WALK_FORWARD] * 3
+    assert stats["travel_commands"] == 4
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_final_error_matches_where_the_program_ends(seed):
+    rng = np.random.default_rng(seed)
+    path = rng.uniform(-20, 20, size=(12, 2)).tolist()
+    segments, stats = compile_paths([path], stride=1.0, turn_step=30.0)
+    x, y, _ = replay(program_commands(segments), (*path[0], 90.0), 1.0, 30.0)
+    assert math.hypot(path[-1][0] - x, path[-1][1] - y) == pytest.approx(stats["final_error"])
+
+def test_empty_input_and_angle_wrapping():
+    assert compile_paths([]) == ([], {"max_error": 0.0, "mean_error": 0.0, "final_error": 0.0, "travel_commands": 0})
+    assert normalize_angle(-180.0) == 180.0
+    assert normalize_angle(270.0) == -90.0
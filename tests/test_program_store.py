@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from program_store import MAGIC, Program, ProgramStore, decode_programs, encode_programs
+
+WALK = b'kwkF\n'
+LEFT = b'kvtL\n'
+BALANCE = b'kbalance\n'
+
+
+def test_programs_survive_encode_and_decode():
+    programs = [
+        Program("square", [WALK, LEFT] * 4, [2.5, 1.25] * 4),
+        Program("düsseldorf", [BALANCE], [0.1]),
+        Program("empty", [], []),
+    ]
+    data = encode_programs(programs)
+    assert data.startswith(MAGIC)
+    decoded = decode_programs(data)
+    assert list(decoded) == ["square", "düsseldorf", "empty"]
+    for program in programs:
+        assert decoded[program.name].commands == program.commands
+        assert decoded[program.name].seconds == pytest.approx(program.seconds)
+    assert decoded["square"].wire == (WALK + LEFT) * 4
+
+def test_each_step_costs_five_bytes():
+    one = encode_programs([Program("p", [WALK], [1.0])])
+    nine = encode_programs([Program("p", [WALK] * 9, [1.0] * 9)])
+    assert len(nine) - len(one) == 8 * 5
+
+def test_bad_files_are_rejected():
+    with pytest.raises(ValueError):
+        decode_programs(b'NOPE\x01\x00')
+    with pytest.raises(ValueError):
+        decode_programs(MAGIC + b'\x63\x00')
+
+def test_store_reloads_after_another_writer_saves(tmp_path):
+    path = str(tmp_path / "programs.bin")
+    writer = ProgramStore(path)
+    writer.add_steps("turn", [(LEFT, 1.5)])
+    writer.save()
+    reader = ProgramStore(path).load()
+    assert reader["turn"].steps == [(LEFT, 1.5)]
+    assert not reader.reload_if_changed()
+
+    writer.add_steps("walk", [(WALK, 2.0)])
+    writer.save()
+    os.utime(path, ns=(0, 0))  # Make sure the mtime differs even on coarse clocks
+    assert reader.reload_if_changed()
+    assert reader.names() == ["turn", "walk"]
+    assert not os.path.exists(path + '.tmp')
@@ -0,0 +1,32 @@
+from command_timing import DurationTable
+from sequence_optimizer import optimize_sequence
+
+WALK = b'kwkF\n'
+LEFT = b'kvtL\n'
+BALANCE = b'kbalance\n'
+SIT = b'ksit\n'
+REST = b'd\n'
+
+
+def table():
+    return DurationTable(path="unused.json", default=2.0)  # Nothing measured: every command takes 2 s
+
+def test_repeats_become_one_longer_gait():
+    steps, saved = optimize_sequence([LEFT, LEFT, LEFT], table())
+    durations = table()
+    assert steps == [(LEFT, 2.0 + 2 * durations.repeat_duration(LEFT))]
+    assert saved == 6.0 - steps[0][1]
+
+def test_balance_before_a_gait_is_dropped():
+    steps, saved = optimize_sequence([WALK, BALANCE, LEFT, BALANCE, WALK, BALANCE], table())
+    assert [command for command, _ in steps] == [WALK, LEFT, WALK, BALANCE]
+    assert saved == 4.0
+
+def test_deliberate_poses_are_kept():
+    sequence = [WALK, SIT, WALK, REST, LEFT, BALANCE, SIT]
+    steps, _ = optimize_sequence(sequence, table())
+    assert [command for command, _ in steps] == sequence
+    assert all(seconds == 2.0 for _, seconds in steps)
+
+def test_empty_sequence():
+    assert optimize_sequence([], table()) == ([], 0)
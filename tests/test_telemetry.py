@@ -0,0 +1,56 @@
+import numpy as np
+
+from telemetry import RingBuffer, TelemetryReader
+
+
+def test_snapshot_of_partly_filled_ring():
+    ring = RingBuffer(1, size=8)
+    for i in range(5):
+        ring.append((i,), float(i))
+    times, values = ring.snapshot()
+    assert times.tolist() == [0, 1, 2, 3, 4]
+    assert values[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+def test_snapshot_of_full_wrapped_ring():
+    ring = RingBuffer(2, size=8)
+    for i in range(15):
+        ring.append((i, -i), float(i))
+    times, values = ring.snapshot()
+    assert times.tolist() == list(range(7, 15))
+    assert np.array_equal(values, np.array([(i, -i) for i in range(7, 15)]))
+
+    times, values = ring.snapshot(3)
+    assert times.tolist() == [12, 13, 14]
+    assert ring.latest().tolist() == [14, -14]
+
+def test_only_echoes_of_sent_tokens_are_acks():
+    acks = []
+    telemetry = TelemetryReader(None, on_ack=acks.append)
+    assert telemetry.parse("ready") == "text"
+    telemetry.sent(b'kwkF\n')
+    telemetry.sent(b'kbalance\n')
+    assert telemetry.parse("kbalance") == "ack"
+    assert telemetry.parse("kbalance") == "text"
+    assert telemetry.parse("kwkF") == "ack"
+    assert acks == ["kbalance", "kwkF"]
+
+def test_snapshot_gives_up_on_a_writer_that_keeps_lapping_it():
+    ring = RingBuffer(1, size=8)
+    for i in range(10):
+        ring.append((i,), float(i))
+    ring.started = ring.count + 3  # As if the writer always got three rows further during the copy
+    times, values = ring.snapshot()
+    assert times.tolist() == [5, 6, 7, 8, 9]
+    assert values[:, 0].tolist() == [5, 6, 7, 8, 9]
+
+def test_only_firmware_formats_are_readings():
+    telemetry = TelemetryReader(None)
+    assert telemetry.parse("ypr: -1.25 3.50 0.75") == "imu"
+    assert telemetry.parse("-1.25\t3.50\t0.75\t12\t-40\t8150") == "imu"
+    assert telemetry.imu.latest().tolist() == [-1.25, 3.5, 0.75]
+    assert telemetry.parse("Voltage: 7.41") == "battery"
+    assert telemetry.parse("Battery 7.4V") == "battery"
+    assert telemetry.battery.latest().tolist() == [7.4]
+    assert telemetry.parse("calibrated joints 0 8 12") == "text"
+    assert telemetry.parse("power on, skill 3 of 12") == "text"
+    assert telemetry.battery.latest().tolist() == [7.4]
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from transport import BALANCE, BittleTransport
+
+WALK = b'kwkF\n'
+LEFT = b'kvtL\n'
+
+
+class FakeSerial:
+    def __init__(self, fail=False):
+        self.written = []
+        self.fail = fail
+        self.is_open = True
+        self.first_write = threading.Event()
+
+    def write(self, data):
+        if self.fail:
+            raise OSError("device disconnected")
+        self.written.append(data)
+        self.first_write.set()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def test_stop_cancels_pending_motion_and_cuts_the_hold_short():
+    ser = FakeSerial()
+    transport = BittleTransport(ser)
+    transport.send(WALK, hold=5.0)
+    transport.send(LEFT, hold=5.0)
+    assert ser.first_write.wait(1.0)
+
+    start = time.monotonic()
+    transport.stop()
+    assert transport.wait_idle(timeout=1.0)
+    assert time.monotonic() - start < 1.0
+    assert ser.written == [WALK, BALANCE]
+    assert transport.pending() == 0
+    transport.close(None)
+
+def test_on_write_runs_outside_the_write_lock():
+    ser = FakeSerial()
+    transport = BittleTransport(ser)
+    calls = []
+    transport.on_write = lambda command, when: calls.append((command, transport._write_lock.locked()))
+    transport.send(WALK)
+    transport.stop()
+    assert transport.wait_idle(timeout=1.0)
+    assert calls and all(not locked for _, locked in calls)
+    transport.close(None)
+
+def test_serial_error_wakes_waiters_and_is_raised():
+    transport = BittleTransport(FakeSerial(fail=True))
+    transport.send(WALK, hold=5.0)
+    transport.send(LEFT, hold=5.0)
+    with pytest.raises(OSError):
+        transport.wait_idle(timeout=1.0)
+    assert transport.pending() == 0
+    with pytest.raises(OSError):
+        transport.send(WALK)
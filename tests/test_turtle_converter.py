@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+import pytest
+
+import turtle_converter
+from turtle_converter import (find_contours_tiled, open_gray, order_paths, outline_gray, outline_rows,
+                              travel_distances)
+
+
+def random_gray(seed, height=500, width=700, scale=3):
+    """Smooth random image with plenty of contours, some crossing every seam."""
+    rng = np.random.default_rng(seed)
+    small = (rng.random((height // scale, width // scale)) * 255).astype(np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+def full_contours(gray, method=cv2.CHAIN_APPROX_SIMPLE):
+    contours, _ = cv2.findContours(outline_gray(gray), cv2.RETR_EXTERNAL, method)
+    return [contour.reshape(-1, 2) for contour in contours]
+
+@pytest.mark.parametrize("strip_height", [64, 100, 256])
+def test_strip_outlines_match_full_outline(strip_height):
+    gray = random_gray(0)
+    strips = [outline_rows(gray, y0, min(y0 + strip_height, len(gray))) for y0 in range(0, len(gray), strip_height)]
+    assert np.array_equal(np.concatenate(strips), outline_gray(gray))
+
+def test_single_strip_matches_full_image():
+    gray = random_gray(1)
+    expected = {frozenset(map(tuple, contour.tolist())) for contour in full_contours(gray) if len(contour) > 5}
+    tiled = {frozenset(map(tuple, contour.tolist())) for contour in find_contours_tiled(gray, strip_height=len(gray))}
+    assert tiled == expected
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("strip_height", [64, 100, 256])
+def test_tiled_contours_lie_on_full_contours(seed, strip_height):
+    gray = random_gray(seed)
+    on_contour = {tuple(point) for contour in full_contours(gray, cv2.CHAIN_APPROX_NONE) for point in contour.tolist()}
+    tiled = find_contours_tiled(gray, strip_height=strip_height)
+    assert tiled
+    for contour in tiled:
+        assert {tuple(point) for point in contour.tolist()} <= on_contour
+
+    # Contours clear of every seam come back unchanged
+    seams = np.arange(strip_height, len(gray), strip_height)
+    tiled_sets = {frozenset(map(tuple, contour.tolist())) for contour in tiled}
+    for contour in full_contours(gray):
+        ys = contour[:, 1]
+        near_seam = np.any((seams[:, None] >= ys.min()) & (seams[:, None] - 1 <= ys.max()))
+        if len(contour) > 5 and not near_seam:
+            assert frozenset(map(tuple, contour.tolist())) in tiled_sets
+
+def test_open_gray_decodes_images_to_a_memory_map(tmp_path):
+    gray = random_gray(2, 120, 160)
+    path = str(tmp_path / "image.png")
+    cv2.imwrite(path, gray)
+    mapped = open_gray(path)
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, gray)
+
+def test_open_gray_warns_when_a_large_png_is_decoded_whole(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(turtle_converter, "MAX_DECODED_PIXELS", 100)
+    path = str(tmp_path / "image.png")
+    cv2.imwrite(path, random_gray(3, 20, 20))
+    open_gray(path)
+    assert ".npy" in capsys.readouterr().out
+
+    npy = str(tmp_path / "image.npy")
+    np.save(npy, random_gray(3, 20, 20))
+    open_gray(npy)
+    assert capsys.readouterr().out == ""
+
+def test_order_paths_walks_segments_end_to_end():
+    segments = [[(20, 0), (30, 0)], [(0, 0), (10, 0)], [(20, 0), (10, 0)]]
+    ordered = order_paths(segments)
+    assert [path.tolist() for path in ordered] == [[[0, 0], [10, 0]], [[10, 0], [20, 0]], [[20, 0], [30, 0]]]
+    assert travel_distances(ordered) == (30, 0)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_order_paths_draws_every_path_once_with_less_pen_up(seed):
+    rng = np.random.default_rng(seed)
+    paths = [rng.uniform(0, 500, size=(int(rng.integers(2, 6)), 2)) for _ in range(80)]
+    paths.append(np.array([(0, 0), (10, 0), (10, 10), (0, 0)]))  # Closed: may start at any vertex
+    ordered = order_paths(paths)
+
+    def key(path):
+        points = np.asarray(path, dtype=np.float32).tolist()
+        return sorted(map(tuple, points[1:] if points[0] == points[-1] else points))
+    assert sorted(map(key, ordered)) == sorted(map(key, paths))
+
+    pen_down, pen_up = travel_distances(paths)
+    ordered_down, ordered_up = travel_distances(ordered)
+    assert ordered_down == pytest.approx(pen_down, rel=1e-4)
+    assert ordered_up < pen_up
+
+def test_order_paths_skips_single_points():
+    assert order_paths([]) == []
+    assert order_paths([[(1, 1)]]) == []
@@ -0,0 +1,141 @@
+# transport.py
+# The command layer between the scripts and the Bittle's serial port.
+# Motion commands go through a queue drained by a writer thread, which waits out
+# each command's hold time. Stop and rest commands jump the queue: they cancel
+# everything pending, cut the current hold short and are written immediately.
+# If the port fails, the writer thread ends, wakes anyone waiting and the error is
+# raised again from send() and wait_idle().
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+# --- Command Definitions ---
+BALANCE = b'kbalance\n'
+REST = b'd\n'
+
+# --- Priority Levels ---
+# Lower numbers go first. A command at PRIORITY_STOP preempts everything below it.
+PRIORITY_STOP = 0
+PRIORITY_MOTION = 1
+
+
+class BittleTransport:
+    """Sends commands to the Bittle from a writer thread, with stop commands jumping the queue."""
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.stop_latencies = deque(maxlen=100)  # Seconds from stop() to the bytes being on the wire
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._generation = 0  # Bumped by every stop so stale work is dropped
+        self._in_flight = False
+        self._closed = False
+        self.on_write = None  # Optional callback(command, monotonic_time) after each write
+        self.error = None  # The serial error that ended the writer thread, if any
+
+        self._thread = threading.Thread(target=self._run, name="bittle-writer", daemon=True)
+        self._thread.start()
+
+    def send(self, command, hold=0.0, priority=PRIORITY_MOTION):
+        """Queues a command; the writer waits `hold` seconds after it before sending the next one."""
+        if priority <= PRIORITY_STOP:
+            self.stop(command)
+            return
+        with self._cond:
+            if self.error is not None:
+                raise self.error
+            heapq.heappush(self._queue, (priority, next(self._counter), command, hold))
+            self._cond.notify_all()
+
+    def send_steps(self, steps):
+        """Queues (command, seconds) steps, e.g. from sequence_optimizer.optimize_sequence."""
+        for command, seconds in steps:
+            self.send(command, seconds)
+
+    def stop(self, command=BALANCE):
+        """Cancels all pending motion and writes `command` right away. Returns the latency in seconds."""
+        start = time.perf_counter()
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+            self._cond.notify_all()
+        with self._write_lock:
+            self.ser.write(command)
+            self.ser.flush()
+        latency = time.perf_counter() - start
+        self._notify(command)
+        self.stop_latencies.append(latency)
+        return latency
+
+    def pending(self):
+        """How many commands are waiting behind the one being sent."""
+        with self._cond:
+            return len(self._queue)
+
+    def busy(self):
+        with self._cond:
+            return bool(self._queue) or self._in_flight
+
+    def wait_idle(self, timeout=None):
+        """Blocks until everything queued has been sent and held. Returns False on timeout."""
+        with self._cond:
+            idle = self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+            if self.error is not None:
+                raise self.error
+            return idle
+
+    def close(self, command=REST):
+        """Stops the robot with `command`, ends the writer thread and closes the port."""
+        if self.ser.is_open and command:
+            self.stop(command)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        if self.ser.is_open:
+            self.ser.close()
+
+    def _notify(self, command):
+        if self.on_write is not None:
+            self.on_write(command, time.monotonic())
+
+    def _fail(self, error):
+        with self._cond:
+            self.error = error
+            self._queue.clear()
+            self._in_flight = False
+            self._closed = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    return
+                _, _, command, hold = heapq.heappop(self._queue)
+                generation = self._generation
+                self._in_flight = True
+
+            try:
+                with self._write_lock:
+                    # A stop that arrived after the pop wins: never send stale motion after it
+                    sent = generation == self._generation
+                    if sent:
+                        self.ser.write(command)
+            except OSError as e:  # pyserial's SerialException is an OSError
+                self._fail(e)
+                return
+            if sent:
+                self._notify(command)  # Outside the lock, so a callback may itself call stop()
+
+            with self._cond:
+                if hold > 0:
+                    self._cond.wait_for(lambda: self._generation != generation or self._closed, hold)
+                self._in_flight = False
+                self._cond.notify_all()
@@ -3,6 +3,9 @@
 import serial
 import time
 
+from command_timing import load_durations
+from sequence_optimizer import optimize_sequence
+
 # --- Bittle Configuration ---
 SERIAL_PORT = '/dev/tty.BittleB3_SSP' 
 BAUD_RATE = 115200
@@ -45,20 +48,23 @@ def main():
     if not bittle_serial:
         return
 
+    durations = load_durations(executor="triangle_test")
+
     try:
         # Start the Bittle in a balanced state
         print("Bittle standing by...")
         bittle_serial.write(BALANCE)
-        time.sleep(2)
+        time.sleep(durations.duration(BALANCE))
 
-        print(f"Executing your sequence ({len(YOUR_TRIANGLE_SEQUENCE)} steps)...")
+        # Drop the in-between BALANCEs and merge repeats before sending
+        steps, saved = optimize_sequence(YOUR_TRIANGLE_SEQUENCE, durations)
+        print(f"Executing your sequence ({len(steps)} steps, {saved:.1f}s faster than step by step)...")
         
         # Loop through each command in the sequence you created
-        for i, command in enumerate(YOUR_TRIANGLE_SEQUENCE):
-            print(f"--> Sending step {i+1}: {command.decode().strip()}")
+        for i, (command, seconds) in enumerate(steps):
+            print(f"--> Sending step {i+1}: {command.decode().strip()} for {seconds:.1f}s")
             bittle_serial.write(command)
-            # A short pause for each action to complete
-            time.sleep(2.0)
+            time.sleep(seconds)
             # 1.5 is too slow , and we should be doing it at all 
 
         
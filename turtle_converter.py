@@ -1,227 +1,876 @@
-import cv2
-import turtle
-import numpy as np
-import math
-from collections import deque
-import time
-
-turtle.tracer(0)
-turtle.bgcolor("white")
-
-def outline(image):
-    """Extract outline from image using adaptive thresholding"""
-    src_image = cv2.imread(image, 0)
-    blurred = cv2.GaussianBlur(src_image, (7, 7), 0)
-    th3 = cv2.adaptiveThreshold(blurred, maxValue=255, adaptiveMethod=cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                thresholdType=cv2.THRESH_BINARY, blockSize=9, C=2)
-    return th3
-
-def douglas_peucker(points, epsilon):
-    """Simplify a curve using Douglas-Peucker algorithm"""
-    if len(points) <= 2:
-        return points
-    
-    # Find the point with maximum distance from line between start and end
-    start, end = points[0], points[-1]
-    max_dist = 0
-    max_idx = 0
-    
-    for i in range(1, len(points) - 1):
-        dist = point_to_line_distance(points[i], start, end)
-        if dist > max_dist:
-            max_dist = dist
-            max_idx = i
-    
-    # If max distance is greater than epsilon, recursively simplify
-    if max_dist > epsilon:
-        # Recursive call
-        left = douglas_peucker(points[:max_idx + 1], epsilon)
-        right = douglas_peucker(points[max_idx:], epsilon)
-        
-        # Combine results (avoid duplicate point)
-        return left[:-1] + right
-    else:
-        # Return just start and end points
-        return [start, end]
-
-def point_to_line_distance(point, line_start, line_end):
-    """Calculate perpendicular distance from point to line"""
-    x0, y0 = point
-    x1, y1 = line_start
-    x2, y2 = line_end
-    
-    # If line start and end are the same
-    if x1 == x2 and y1 == y2:
-        return math.sqrt((x0 - x1)**2 + (y0 - y1)**2)
-    
-    # Calculate distance
-    num = abs((y2 - y1) * x0 - (x2 - x1) * y0 + x2 * y1 - y2 * x1)
-    den = math.sqrt((y2 - y1)**2 + (x2 - x1)**2)
-    
-    return num / den if den > 0 else 0
-
-def find_contours_cv2(image):
-    """Use OpenCV to find contours more efficiently"""
-    th3 = outline(image)
-    contours, _ = cv2.findContours(th3, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Convert to our format
-    converted_contours = []
-    for contour in contours:
-        if len(contour) > 5:  # Only keep significant contours
-            points = [(int(point[0][0]), int(point[0][1])) for point in contour]
-            converted_contours.append(points)
-    
-    return converted_contours
-
-def smooth_contour_lines(contour, angle_threshold=15):
-    """Combine nearby points into smooth lines based on angle consistency"""
-    if len(contour) < 3:
-        return contour
-    
-    smoothed = [contour[0]]
-    current_direction = None
-    
-    for i in range(1, len(contour) - 1):
-        prev_point = smoothed[-1]
-        current_point = contour[i]
-        next_point = contour[i + 1]
-        
-        # Calculate direction from previous to current
-        dx1 = current_point[0] - prev_point[0]
-        dy1 = current_point[1] - prev_point[1]
-        
-        # Calculate direction from current to next
-        dx2 = next_point[0] - current_point[0]
-        dy2 = next_point[1] - current_point[1]
-        
-        if dx1 == 0 and dy1 == 0:
-            continue
-        if dx2 == 0 and dy2 == 0:
-            continue
-        
-        # Calculate angles
-        angle1 = math.degrees(math.atan2(dy1, dx1))
-        angle2 = math.degrees(math.atan2(dy2, dx2))
-        
-        # Calculate angle difference
-        angle_diff = abs(angle1 - angle2)
-        if angle_diff > 180:
-            angle_diff = 360 - angle_diff
-        
-        # If angle changes significantly, this is a corner point
-        if angle_diff > angle_threshold:
-            smoothed.append(current_point)
-    
-    # Always add the last point
-    smoothed.append(contour[-1])
-    
-    return smoothed
-
-def draw_smooth_line(t, start, end):
-    """Draw a smooth line from start to end point"""
-    dx = end[0] - start[0]
-    dy = end[1] - start[1]
-    
-    if dx == 0 and dy == 0:
-        return
-    
-    # Calculate angle and distance
-    angle = math.degrees(math.atan2(dy, dx))
-    distance = math.sqrt(dx**2 + dy**2)
-    
-    # Move to start position
-    t.penup()
-    t.goto(start)
-    t.pendown()
-    
-    # Set heading and draw line
-    t.setheading(angle)
-    t.forward(distance)
-
-def draw_contour_smooth(t, contour):
-    """Draw a contour as smooth connected lines"""
-    if len(contour) < 2:
-        return
-    
-    # Smooth the contour first
-    smoothed = smooth_contour_lines(contour, angle_threshold=20)
-    
-    # Further simplify with Douglas-Peucker
-    simplified = douglas_peucker(smoothed, epsilon=8)
-    
-    if len(simplified) < 2:
-        return
-    
-    # Draw the simplified contour
-    t.penup()
-    t.goto(simplified[0])
-    t.pendown()
-    
-    for i in range(1, len(simplified)):
-        current_pos = t.pos()
-        target = simplified[i]
-        
-        # Calculate angle and move smoothly
-        dx = target[0] - current_pos[0]
-        dy = target[1] - current_pos[1]
-        
-        if dx != 0 or dy != 0:
-            angle = math.degrees(math.atan2(dy, dx))
-            distance = math.sqrt(dx**2 + dy**2)
-            
-            t.setheading(angle)
-            t.forward(distance)
-
-def draw_image(image, x, y):
-    """Main function to process and draw image with smooth lines"""
-    # Get image dimensions for centering
-    im = cv2.imread(image, 0)
-    HEIGHT, WIDTH = im.shape
-    
-    # Find contours using OpenCV
-    contours = find_contours_cv2(image)
-    
-    # Filter and sort contours by area (largest first)
-    significant_contours = []
-    for contour in contours:
-        if len(contour) > 10:  # Only keep contours with enough points
-            # Calculate approximate area
-            area = cv2.contourArea(np.array(contour).reshape(-1, 1, 2))
-            if area > 100:  # Filter out very small contours
-                significant_contours.append((area, contour))
-    
-    # Sort by area (largest first)
-    significant_contours.sort(key=lambda x: x[0], reverse=True)
-    
-    # Setup turtle
-    t = turtle.Turtle()
-    t.color("black")
-    t.width(2)
-    t.speed(0)
-    
-    print(f"Drawing {len(significant_contours)} contours")
-    
-    # Draw each contour
-    for area, contour in significant_contours:
-        # Transform coordinates to center the image
-        transformed_contour = []
-        for point in contour:
-            new_x = point[0] - WIDTH / 2 + x
-            new_y = -1 * (point[1] - HEIGHT / 2) + y  # Flip Y axis
-            transformed_contour.append((new_x, new_y))
-        
-        draw_contour_smooth(t, transformed_contour)
-        turtle.update()
-    
-    t.hideturtle()
-
-# Configuration
-image_files = ['patrick.jpg'] 
-image_positions = [(0, 0)]  # Positions for each image
-
-# Draw each image
-for image_file, (x, y) in zip(image_files, image_positions):
-    draw_image(image_file, x, y)
-
-turtle.done()
\ No newline at end of file
+# turtle_converter.py
+# Turns an image into simplified line paths and draws them with turtle.
+# Importing this module has no side effects: cv2 and turtle are only imported
+# by the functions that need them, so batch tools can use the path functions
+# without a display. Run it as a script to draw images:
+#   python turtle_converter.py patrick.jpg
+#   python turtle_converter.py --camera 0
+# Memory stays bounded by the strip size only for .npy input (see open_gray):
+#   python turtle_converter.py --strip-height 512 huge.npy
+import argparse
+import bisect
+import math
+import tempfile
+import time
+
+import numpy as np
+
+# Rows of context the blur (7x7) plus the threshold window (9x9) need on each side of a strip
+OUTLINE_HALO = 3 + 4
+# PNG/JPEG larger than this are still decoded whole in strip mode, so open_gray warns about them
+MAX_DECODED_PIXELS = 50_000_000
+
+def outline(image):
+    """Extract outline from image using adaptive thresholding"""
+    import cv2
+    
+    src_image = cv2.imread(image, 0)
+    return outline_gray(src_image)
+
+def outline_gray(src_image):
+    """Adaptive threshold of an already-loaded grayscale image"""
+    import cv2
+    
+    blurred = cv2.GaussianBlur(src_image, (7, 7), 0)
+    th3 = cv2.adaptiveThreshold(blurred, maxValue=255, adaptiveMethod=cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                thresholdType=cv2.THRESH_BINARY, blockSize=9, C=2)
+    return th3
+
+def open_gray(image):
+    """
+    Open an image for strip-wise reading, as a memory map so only the rows being
+    processed are paged in. Only .npy files (8-bit grayscale, saved with np.save) are
+    mapped without ever holding the whole image. PNG/JPEG can't be decoded strip by
+    strip with OpenCV, so they are decoded in full once, copied into an anonymous
+    temporary file and mapped from there: the decode itself still peaks at the full
+    image, so very large ones should be converted to .npy first. Pass the result around
+    rather than the file name to avoid decoding again.
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if str(image).endswith(".npy"):
+        return np.load(image, mmap_mode="r")
+    
+    import cv2
+    
+    decoded = cv2.imread(image, 0)
+    if decoded is None:
+        raise FileNotFoundError(f"Could not read image {image}")
+    if decoded.size > MAX_DECODED_PIXELS:
+        print(f"Warning: {image} was decoded whole ({decoded.shape[1]}x{decoded.shape[0]}); "
+              f"save it as 8-bit grayscale .npy to keep memory bounded by the strip size")
+    # The file is deleted when the map is closed; the decoded copy is freed on return
+    gray = np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode="w+", shape=decoded.shape)
+    gray[:] = decoded
+    return gray
+
+def outline_rows(gray, y0, y1):
+    """Outline of rows [y0, y1) only, computed from a strip with enough halo to match outline()"""
+    height = gray.shape[0]
+    top = max(0, y0 - OUTLINE_HALO)
+    bottom = min(height, y1 + OUTLINE_HALO)
+    strip = np.ascontiguousarray(gray[top:bottom])
+    return outline_gray(strip)[y0 - top:y1 - top]
+
+def douglas_peucker(points, epsilon):
+    """Simplify a curve using Douglas-Peucker algorithm, on an (N, 2) array"""
+    points = np.asarray(points, dtype=np.float32)
+    if len(points) <= 2:
+        return points
+    
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    
+    # Work through the spans with an explicit stack instead of recursion
+    spans = [(0, len(points) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        
+        # Find the point with maximum distance from line between start and end
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        dx, dy = end - start
+        length = math.hypot(dx, dy)
+        if length == 0:
+            dists = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            dists = np.abs(dy * inner[:, 0] - dx * inner[:, 1] + end[0] * start[1] - end[1] * start[0]) / length
+        max_idx = int(np.argmax(dists))
+        
+        # If max distance is greater than epsilon, split there and keep simplifying
+        if dists[max_idx] > epsilon:
+            split = first + 1 + max_idx
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    
+    return points[keep]
+
+def contour_dtype(height, width):
+    """Smallest integer type that can hold pixel coordinates of an image this size"""
+    return np.int16 if max(height, width) <= np.iinfo(np.int16).max else np.int32
+
+def find_contours_cv2(image):
+    """Use OpenCV to find contours more efficiently"""
+    import cv2
+    
+    th3 = outline(image)
+    contours, _ = cv2.findContours(th3, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    # Convert to our format: one compact (N, 2) array per contour
+    dtype = contour_dtype(*th3.shape)
+    return [contour.reshape(-1, 2).astype(dtype) for contour in contours
+            if len(contour) > 5]  # Only keep significant contours
+
+def _strip_bounds(height, strip_height):
+    return [(y0, min(height, y0 + strip_height)) for y0 in range(0, height, strip_height)]
+
+def _background_labels(gray, y0, y1):
+    """Label the background of rows [y0 - 1, y1 + 1) so neighbouring strips share two rows"""
+    import cv2
+    
+    top = max(0, y0 - 1)
+    bottom = min(gray.shape[0], y1 + 1)
+    binary = outline_rows(gray, top, bottom)
+    count, labels = cv2.connectedComponents(cv2.bitwise_not(binary), connectivity=4)
+    return top, binary, count, labels
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def _remove_collinear(points, closed):
+    """Drop points in the middle of straight runs, like CHAIN_APPROX_SIMPLE"""
+    if len(points) < 3:
+        return points
+    if closed:
+        d_in = points - np.roll(points, 1, axis=0)
+        d_out = np.roll(points, -1, axis=0) - points
+        keep = np.any(d_in != d_out, axis=1)
+    else:
+        d = np.diff(points, axis=0)
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:-1] = np.any(d[:-1] != d[1:], axis=1)
+    return points[keep]
+
+def find_contours_tiled(image, strip_height=512, join_tolerance=3.0):
+    """
+    Outer contours like find_contours_cv2, but the image is processed in horizontal
+    strips so intermediate memory is bounded by the strip size, not the image size.
+
+    Pass 1 labels the background of every strip and merges labels across the
+    overlapping seam rows, recording which background regions reach the image
+    border. Pass 2 traces each strip's outer contours and keeps only the points
+    that face border-connected background, the pixels RETR_EXTERNAL traces for
+    the full image. Fragments cut by a seam are then joined end to start across it.
+
+    Every returned point lies on a contour find_contours_cv2 would return, and
+    contours that don't reach a seam are the same. A contour crossing a seam can
+    come back in more than one piece, though: the join is by nearest endpoint, and
+    parts that touch only diagonally across a seam stay separate. Pieces that end
+    up with 5 points or fewer are dropped like any small contour, so counts can
+    differ slightly from the full-image result.
+    """
+    import cv2
+    
+    gray = open_gray(image)
+    height, width = gray.shape[:2]
+    strips = _strip_bounds(height, strip_height)
+    
+    # --- Pass 1: global background components ---
+    parent = []
+    touches_border = []
+    offsets = []
+    previous = None
+    for y0, y1 in strips:
+        top, _, count, labels = _background_labels(gray, y0, y1)
+        offset = len(parent)
+        offsets.append(offset)
+        parent.extend(range(offset, offset + count))
+        
+        border = np.zeros(count, dtype=bool)
+        border[labels[:, 0]] = True
+        border[labels[:, -1]] = True
+        if top == 0:
+            border[labels[0]] = True
+        if top + labels.shape[0] == height:
+            border[labels[-1]] = True
+        border[0] = False  # label 0 is the foreground
+        touches_border.extend(border.tolist())
+        
+        if previous is not None:
+            prev_top, prev_labels, prev_offset = previous
+            # Rows shared with the previous strip
+            shared = prev_top + prev_labels.shape[0] - top
+            a = prev_labels[-shared:].ravel()
+            b = labels[:shared].ravel()
+            both = (a > 0) & (b > 0)
+            pairs = np.unique(np.stack([a[both], b[both]], axis=1), axis=0)
+            for la, lb in pairs:
+                ra = _find(parent, prev_offset + int(la))
+                rb = _find(parent, offset + int(lb))
+                if ra != rb:
+                    parent[rb] = ra
+        previous = (top, labels, offset)
+    
+    outside = np.zeros(len(parent), dtype=bool)
+    for i in range(len(parent)):
+        if touches_border[i]:
+            outside[_find(parent, i)] = True
+    outside = outside[[_find(parent, i) for i in range(len(parent))]]
+    previous = None
+    
+    # --- Pass 2: trace outer contours and keep the externally facing parts ---
+    neighbours = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)])
+    closed_contours = []
+    fragments = []
+    for (y0, y1), offset in zip(strips, offsets):
+        top, binary, _, labels = _background_labels(gray, y0, y1)
+        core = np.ascontiguousarray(binary[y0 - top:y1 - top])
+        contours, hierarchy = cv2.findContours(core, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)
+        
+        if hierarchy is None:
+            continue
+        
+        # Holes inside a strip are holes in the full image too, so only outer contours matter
+        outer = [contour.reshape(-1, 2) for contour, info in zip(contours, hierarchy[0])
+                 if info[3] == -1 and len(contour) >= 2]
+        if not outer:
+            continue
+        
+        # Work on all contours of the strip at once; next/prev wrap within each contour
+        lengths = np.array([len(points) for points in outer])
+        firsts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        points = np.concatenate(outer) + (0, y0)
+        index = np.arange(len(points))
+        owner = np.repeat(np.arange(len(outer)), lengths)
+        nxt = index + 1
+        nxt[firsts + lengths - 1] = firsts
+        prv = index - 1
+        prv[firsts] = firsts + lengths - 1
+        
+        # Orientation of each contour from the shoelace formula
+        cross = points[:, 0] * points[nxt, 1] - points[nxt, 0] * points[:, 1]
+        sign = np.where(np.add.reduceat(cross, firsts) > 0, 1, -1)[owner]
+        
+        # Outward normal of the incoming and outgoing steps at every point
+        d_out = points[nxt] - points
+        d_in = points - points[prv]
+        n_out = sign[:, None] * np.stack([d_out[:, 1], -d_out[:, 0]], axis=1)
+        n_in = sign[:, None] * np.stack([d_in[:, 1], -d_in[:, 0]], axis=1)
+        
+        keep = np.zeros(len(points), dtype=bool)
+        for offset_xy in neighbours:
+            faces = (n_out @ offset_xy > 0) | (n_in @ offset_xy > 0)
+            nx = points[:, 0] + offset_xy[0]
+            ny = points[:, 1] + offset_xy[1]
+            off_image = (nx < 0) | (nx >= width) | (ny < 0) | (ny >= height)
+            inside = ~off_image
+            label = np.zeros(len(points), dtype=np.int64)
+            label[inside] = labels[ny[inside] - top, nx[inside]]
+            external = off_image | ((label > 0) & outside[offset + label])
+            keep |= faces & external
+        
+        all_kept = np.logical_and.reduceat(keep, firsts)
+        any_kept = np.logical_or.reduceat(keep, firsts)
+        for k in np.flatnonzero(any_kept):
+            contour_points = points[firsts[k]:firsts[k] + lengths[k]]
+            if all_kept[k]:
+                closed_contours.append(contour_points)
+                continue
+            
+            # Split the cyclic contour into runs of kept points
+            contour_keep = keep[firsts[k]:firsts[k] + lengths[k]]
+            start = int(np.argmin(contour_keep))
+            contour_points = np.roll(contour_points, -start, axis=0)
+            contour_keep = np.roll(contour_keep, -start)
+            edges = np.flatnonzero(np.diff(contour_keep.astype(np.int8)))
+            for run_start, run_end in zip(edges[::2] + 1, edges[1::2] + 1):
+                fragments.append(contour_points[run_start:run_end])
+            if len(edges) % 2:
+                fragments.append(contour_points[edges[-1] + 1:])
+    
+    # --- Join fragments across seams, end to start ---
+    seams = [y1 for _, y1 in strips[:-1]]
+    cell = max(join_tolerance, 1.0)
+    starts = {}
+    for i, fragment in enumerate(fragments):
+        seam = _nearest_seam(fragment[0][1], seams, join_tolerance)
+        if seam is not None:
+            starts.setdefault((seam, int(fragment[0][0] // cell)), []).append(i)
+    following = {}
+    taken = set()
+    for i, fragment in enumerate(fragments):
+        seam = _nearest_seam(fragment[-1][1], seams, join_tolerance)
+        if seam is None:
+            continue
+        best = None
+        best_dist = join_tolerance
+        column = int(fragment[-1][0] // cell)
+        candidates = starts.get((seam, column - 1), []) + starts.get((seam, column), []) + starts.get((seam, column + 1), [])
+        for j in candidates:
+            if j in taken or j == i:
+                continue
+            dist = math.dist(fragment[-1], fragments[j][0])
+            if dist <= best_dist:
+                best = j
+                best_dist = dist
+        if best is not None:
+            following[i] = best
+            taken.add(best)
+    
+    converted_contours = []
+    dtype = contour_dtype(height, width)
+    
+    def emit(points, closed):
+        points = _remove_collinear(points, closed)
+        if len(points) > 5:  # Only keep significant contours
+            converted_contours.append(points.astype(dtype))
+    
+    for points in closed_contours:
+        emit(points, True)
+    
+    visited = set()
+    chain_starts = [i for i in range(len(fragments)) if i not in taken]
+    for i in chain_starts + list(range(len(fragments))):
+        if i in visited:
+            continue
+        chain = []
+        j = i
+        while j is not None and j not in visited:
+            visited.add(j)
+            chain.append(fragments[j])
+            j = following.get(j)
+        emit(np.concatenate(chain), closed=j is not None)
+    
+    return converted_contours
+
+def _nearest_seam(y, seams, tolerance):
+    """The seam row a fragment endpoint sits on, if any (seams are sorted)"""
+    i = bisect.bisect_left(seams, y - tolerance)
+    if i < len(seams) and seams[i] - 1 - tolerance <= y <= seams[i] + tolerance:
+        return seams[i]
+    return None
+
+def smooth_contour_lines(contour, angle_threshold=15):
+    """Combine nearby points into smooth lines based on angle consistency"""
+    if len(contour) < 3:
+        return contour
+    
+    # Each kept point depends on the previous kept one, so this stays a scalar loop
+    points = np.asarray(contour).tolist()
+    kept = [0]
+    
+    for i in range(1, len(points) - 1):
+        prev_point = points[kept[-1]]
+        current_point = points[i]
+        next_point = points[i + 1]
+        
+        # Calculate direction from previous to current
+        dx1 = current_point[0] - prev_point[0]
+        dy1 = current_point[1] - prev_point[1]
+        
+        # Calculate direction from current to next
+        dx2 = next_point[0] - current_point[0]
+        dy2 = next_point[1] - current_point[1]
+        
+        if dx1 == 0 and dy1 == 0:
+            continue
+        if dx2 == 0 and dy2 == 0:
+            continue
+        
+        # Calculate angles
+        angle1 = math.degrees(math.atan2(dy1, dx1))
+        angle2 = math.degrees(math.atan2(dy2, dx2))
+        
+        # Calculate angle difference
+        angle_diff = abs(angle1 - angle2)
+        if angle_diff > 180:
+            angle_diff = 360 - angle_diff
+        
+        # If angle changes significantly, this is a corner point
+        if angle_diff > angle_threshold:
+            kept.append(i)
+    
+    # Always add the last point
+    kept.append(len(points) - 1)
+    
+    return np.asarray(contour)[kept]
+
+def draw_smooth_line(t, start, end):
+    """Draw a smooth line from start to end point"""
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    
+    if dx == 0 and dy == 0:
+        return
+    
+    # Calculate angle and distance
+    angle = math.degrees(math.atan2(dy, dx))
+    distance = math.sqrt(dx**2 + dy**2)
+    
+    # Move to start position
+    t.penup()
+    t.goto(start)
+    t.pendown()
+    
+    # Set heading and draw line
+    t.setheading(angle)
+    t.forward(distance)
+
+def simplify_contour(contour):
+    """Smooth and simplify a contour into the path that actually gets drawn"""
+    if len(contour) < 2:
+        return np.empty((0, 2), dtype=np.float32)
+    
+    # Smooth the contour first
+    smoothed = smooth_contour_lines(contour, angle_threshold=20)
+    
+    # Further simplify with Douglas-Peucker
+    return douglas_peucker(smoothed, epsilon=8)
+
+def draw_contour_smooth(t, contour):
+    """Draw a contour as smooth connected lines"""
+    draw_path(t, simplify_contour(contour))
+
+def draw_path(t, simplified):
+    """Draw an already-simplified path with the turtle"""
+    if len(simplified) < 2:
+        return
+    
+    simplified = np.asarray(simplified).tolist()
+    
+    # Draw the simplified contour
+    t.penup()
+    t.goto(simplified[0])
+    t.pendown()
+    
+    for i in range(1, len(simplified)):
+        current_pos = t.pos()
+        target = simplified[i]
+        
+        # Calculate angle and move smoothly
+        dx = target[0] - current_pos[0]
+        dy = target[1] - current_pos[1]
+        
+        if dx != 0 or dy != 0:
+            angle = math.degrees(math.atan2(dy, dx))
+            distance = math.sqrt(dx**2 + dy**2)
+            
+            t.setheading(angle)
+            t.forward(distance)
+
+def path_length(path):
+    """Total length of a polyline"""
+    steps = np.diff(np.asarray(path, dtype=np.float32), axis=0)
+    return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+
+def travel_distances(paths, start=(0, 0)):
+    """Return (pen_down, pen_up) distance for drawing the paths in order"""
+    pen_down = 0.0
+    pen_up = 0.0
+    position = start
+    for path in paths:
+        if len(path) < 2:
+            continue
+        pen_up += math.dist(position, path[0].tolist())
+        pen_down += path_length(path)
+        position = path[-1].tolist()
+    return pen_down, pen_up
+
+class _EndpointGrid:
+    """Uniform grid over candidate entry points for nearest-neighbor queries"""
+    
+    def __init__(self, entries, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        for entry in entries:
+            point = entry[2]
+            key = (int(point[0] // cell_size), int(point[1] // cell_size))
+            self.cells.setdefault(key, []).append(entry)
+        self.bounds = (
+            min(key[0] for key in self.cells), max(key[0] for key in self.cells),
+            min(key[1] for key in self.cells), max(key[1] for key in self.cells),
+        )
+    
+    def _ring(self, cx, cy, ring):
+        """Grid cells exactly `ring` steps away from (cx, cy)"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for gx in range(cx - ring, cx + ring + 1):
+            yield (gx, cy - ring)
+            yield (gx, cy + ring)
+        for gy in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, gy)
+            yield (cx + ring, gy)
+    
+    def nearest(self, point, visited):
+        """Closest entry whose path is not visited yet, searching rings outward"""
+        cx = int(point[0] // self.cell_size)
+        cy = int(point[1] // self.cell_size)
+        best = None
+        best_dist = math.inf
+        ring = 0
+        max_ring = None
+        min_x, max_x, min_y, max_y = self.bounds
+        extent = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+        while ring <= extent:
+            for key in self._ring(cx, cy, ring):
+                bucket = self.cells.get(key)
+                if not bucket:
+                    continue
+                # Drop entries of finished paths while we are here
+                bucket[:] = [entry for entry in bucket if entry[0] not in visited]
+                if not bucket:
+                    del self.cells[key]
+                    continue
+                for entry in bucket:
+                    dist = math.dist(point, entry[2])
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = entry
+            if best is not None and max_ring is None:
+                # Anything closer can be at most one ring further out
+                max_ring = ring + int(math.ceil(best_dist / self.cell_size))
+            if max_ring is not None and ring >= max_ring:
+                break
+            ring += 1
+        return best
+
+def _oriented_path(path, closed, entry_index):
+    """Return the path rearranged to start at entry_index"""
+    if closed:
+        ring = path[:-1] if np.array_equal(path[0], path[-1]) else path
+        return np.concatenate([ring[entry_index:], ring[:entry_index], ring[entry_index:entry_index + 1]])
+    if entry_index == 0:
+        return path
+    return path[::-1]
+
+def order_paths(paths, start=(0, 0), closed_tolerance=3.0, two_opt_window=50, two_opt_passes=3):
+    """
+    Reorder paths to minimize pen-up travel.
+    Nearest-neighbor over a grid index of entry points builds the tour, then a
+    windowed 2-opt pass removes crossings. Open paths can be entered at either
+    end, closed paths at any vertex.
+    """
+    paths = [np.asarray(path, dtype=np.float32) for path in paths if len(path) >= 2]
+    if not paths:
+        return []
+    
+    closed = [math.dist(path[0], path[-1]) <= closed_tolerance for path in paths]
+    
+    # Candidate entry points: (path index, vertex index, point)
+    entries = []
+    for i, path in enumerate(paths):
+        if closed[i]:
+            ring_length = len(path) - 1 if np.array_equal(path[0], path[-1]) else len(path)
+            for k, point in enumerate(path[:ring_length].tolist()):
+                entries.append((i, k, tuple(point)))
+        else:
+            entries.append((i, 0, tuple(path[0].tolist())))
+            entries.append((i, len(path) - 1, tuple(path[-1].tolist())))
+    
+    xs = [entry[2][0] for entry in entries]
+    ys = [entry[2][1] for entry in entries]
+    span = max(max(xs) - min(xs), max(ys) - min(ys), 1.0)
+    grid = _EndpointGrid(entries, cell_size=max(span / math.sqrt(len(entries)), 1.0))
+    
+    # Greedy nearest-neighbor tour
+    visited = set()
+    tour = []
+    position = start
+    while len(tour) < len(paths):
+        i, k, _ = grid.nearest(position, visited)
+        visited.add(i)
+        oriented = _oriented_path(paths[i], closed[i], k)
+        tour.append(oriented)
+        position = tuple(oriented[-1].tolist())
+    
+    # Windowed 2-opt: reversing tour[i..j] also reverses the direction of each path in it
+    heads = [tuple(path[0].tolist()) for path in tour]
+    tails = [tuple(path[-1].tolist()) for path in tour]
+    for _ in range(two_opt_passes):
+        improved = False
+        for i in range(len(tour)):
+            before = tails[i - 1] if i > 0 else start
+            for j in range(i + 1, min(i + two_opt_window, len(tour))):
+                after = heads[j + 1] if j + 1 < len(tour) else None
+                old_cost = math.dist(before, heads[i])
+                new_cost = math.dist(before, tails[j])
+                if after is not None:
+                    old_cost += math.dist(tails[j], after)
+                    new_cost += math.dist(heads[i], after)
+                if new_cost < old_cost - 1e-9:
+                    tour[i:j + 1] = [path[::-1] for path in reversed(tour[i:j + 1])]
+                    heads[i:j + 1], tails[i:j + 1] = tails[i:j + 1][::-1], heads[i:j + 1][::-1]
+                    improved = True
+        if not improved:
+            break
+    
+    return tour
+
+def draw_paths_canvas(paths, color="black", width=2, update_interval=0.05):
+    """
+    Fast preview: draw already-simplified paths straight onto the turtle
+    screen's Tk canvas, one multi-point line item per path.
+    Screen updates are batched on a time budget instead of once per contour.
+    """
+    import turtle
+    
+    screen = turtle.Screen()
+    canvas = screen.getcanvas()
+    
+    last_update = time.perf_counter()
+    for path in paths:
+        if len(path) < 2:
+            continue
+        
+        # Turtle coordinates have Y pointing up, the canvas has Y pointing down
+        flat = (np.asarray(path) * (1, -1)).ravel().tolist()
+        canvas.create_line(*flat, fill=color, width=width, capstyle="round", joinstyle="round")
+        
+        now = time.perf_counter()
+        if now - last_update >= update_interval:
+            canvas.update_idletasks()
+            last_update = now
+    
+    canvas.update()
+
+def image_paths(image, x=0, y=0, optimize_order=True, strip_height=None):
+    """
+    Extract the simplified, centered paths for an image without drawing.
+    Pass strip_height to process very large images strip by strip; memory is only
+    bounded by the strip size for .npy input (see open_gray).
+    """
+    import cv2
+    
+    if strip_height:
+        gray = open_gray(image)  # Decoded once; both the size and the strips come from the map
+        HEIGHT, WIDTH = gray.shape[:2]
+        contours = find_contours_tiled(gray, strip_height=strip_height)
+    else:
+        # Get image dimensions for centering
+        im = cv2.imread(image, 0)
+        HEIGHT, WIDTH = im.shape
+        
+        # Find contours using OpenCV
+        contours = find_contours_cv2(image)
+    
+    # Only keep contours with enough points
+    contours = [contour for contour in contours if len(contour) > 10]
+    if not contours:
+        return []
+    
+    # Center the image and flip the Y axis as one affine transform over all points
+    lengths = np.array([len(contour) for contour in contours])
+    points = np.concatenate(contours).astype(np.float32)
+    points *= np.float32([1, -1])
+    points += np.float32([x - WIDTH / 2, y + HEIGHT / 2])
+    transformed_contours = np.split(points, np.cumsum(lengths)[:-1])
+    
+    # Filter and sort contours by area (largest first)
+    significant_contours = []
+    for contour in transformed_contours:
+        area = cv2.contourArea(contour)
+        if area > 100:  # Filter out very small contours
+            significant_contours.append((area, contour))
+    significant_contours.sort(key=lambda item: item[0], reverse=True)
+    transformed_contours = [contour for _, contour in significant_contours]
+    
+    print(f"Found {len(transformed_contours)} contours")
+    
+    paths = [simplify_contour(contour) for contour in transformed_contours]
+    
+    if optimize_order:
+        pen_down, pen_up = travel_distances(paths)
+        print(f"Before ordering: pen-down {pen_down:.0f}, pen-up {pen_up:.0f}")
+        paths = order_paths(paths)
+        pen_down, pen_up = travel_distances(paths)
+        print(f"After ordering:  pen-down {pen_down:.0f}, pen-up {pen_up:.0f}")
+    
+    return paths
+
+def setup_screen(background="white"):
+    """Prepare the turtle screen for drawing; only called when something is drawn"""
+    import turtle
+    
+    turtle.tracer(0)
+    turtle.bgcolor(background)
+
+def draw_image(image, x, y, fast_preview=False, optimize_order=True, strip_height=None):
+    """Main function to process and draw image with smooth lines"""
+    import turtle
+    
+    setup_screen()
+    paths = image_paths(image, x, y, optimize_order=optimize_order, strip_height=strip_height)
+    
+    print(f"Drawing {len(paths)} paths")
+    
+    if fast_preview:
+        start = time.perf_counter()
+        draw_paths_canvas(paths)
+        print(f"Preview drawn in {time.perf_counter() - start:.3f}s")
+        return
+    
+    # Setup turtle
+    t = turtle.Turtle()
+    t.color("black")
+    t.width(2)
+    t.speed(0)
+    
+    # Draw each path
+    for path in paths:
+        draw_path(t, path)
+        turtle.update()
+    
+    t.hideturtle()
+
+class PathStream:
+    """
+    Streaming version of image_paths for live camera frames.
+    The outline buffers are allocated once per resolution and reused, and a
+    contour that is unchanged since the previous frame (up to `quantum` pixels
+    of jitter) reuses its simplified path instead of being smoothed again.
+    """
+    
+    def __init__(self, min_points=10, min_area=100, quantum=2, optimize_order=False):
+        self.min_points = min_points
+        self.min_area = min_area
+        self.quantum = quantum
+        self.optimize_order = optimize_order
+        self.shape = None
+        self.cache = {}
+        self.reused = 0
+    
+    def _allocate(self, height, width):
+        self.shape = (height, width)
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.blurred = np.empty((height, width), dtype=np.uint8)
+        self.binary = np.empty((height, width), dtype=np.uint8)
+        self.offset = np.float32([-width / 2, height / 2])
+        self.cache = {}
+    
+    def process(self, frame):
+        """Turn one BGR frame into centered, simplified paths (turtle coordinates)"""
+        import cv2
+        
+        height, width = frame.shape[:2]
+        if self.shape != (height, width):
+            self._allocate(height, width)
+        
+        # Same outline as outline_gray(), written into the reused buffers
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.GaussianBlur(self.gray, (7, 7), 0, dst=self.blurred)
+        cv2.adaptiveThreshold(self.blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 9, 2, dst=self.binary)
+        contours, _ = cv2.findContours(self.binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        cache = {}
+        paths = []
+        self.reused = 0
+        for contour in contours:
+            if len(contour) <= self.min_points:
+                continue
+            key = (contour // self.quantum).tobytes()
+            path = self.cache.get(key)
+            if path is None:
+                if cv2.contourArea(contour) <= self.min_area:
+                    continue
+                points = contour.reshape(-1, 2).astype(np.float32)
+                points *= np.float32([1, -1])
+                points += self.offset
+                path = simplify_contour(points)
+            else:
+                self.reused += 1
+            cache[key] = path
+            paths.append(path)
+        self.cache = cache
+        
+        if self.optimize_order:
+            paths = order_paths(paths)
+        return paths
+    
+    def to_pixels(self, path):
+        """Map a path back from turtle coordinates to frame pixels for display"""
+        pixels = (path - self.offset) * np.float32([1, -1])
+        return pixels.astype(np.int32)
+
+def stream_camera(camera=0, optimize_order=False):
+    """Live preview of the paths the robot would draw from what the camera sees"""
+    import cv2
+    
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        print("Error: Could not open camera.")
+        return
+    
+    stream = PathStream(optimize_order=optimize_order)
+    canvas = None
+    frames = 0
+    start = time.perf_counter()
+    print("Streaming paths. Press 'q' to quit.")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            
+            paths = stream.process(frame)
+            
+            if canvas is None or canvas.shape != frame.shape:
+                canvas = np.empty_like(frame)
+            canvas.fill(255)
+            cv2.polylines(canvas, [stream.to_pixels(path) for path in paths if len(path) >= 2],
+                          False, (0, 0, 0), 2)
+            
+            frames += 1
+            elapsed = time.perf_counter() - start
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            cv2.putText(canvas, f"{len(paths)} paths ({stream.reused} reused), {fps:.1f} FPS",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            
+            cv2.imshow("Camera", frame)
+            cv2.imshow("Path Preview", canvas)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw images as smooth turtle line art.")
+    parser.add_argument("images", nargs="*", default=["patrick.jpg"], help="image files to draw")
+    parser.add_argument("--position", type=float, nargs=2, action="append", metavar=("X", "Y"),
+                        help="where to center each image (default 0 0)")
+    parser.add_argument("--turtle", action="store_true",
+                        help="step the turtle along each path instead of drawing straight onto the canvas")
+    parser.add_argument("--no-order", action="store_true", help="keep contours in area order")
+    parser.add_argument("--strip-height", type=int, help="process large images in strips of this many rows "
+                             "(memory is bounded only for .npy input; PNG/JPEG are decoded whole first)")
+    parser.add_argument("--camera", type=int, metavar="INDEX",
+                        help="stream live paths from this camera instead of drawing files")
+    args = parser.parse_args(argv)
+    
+    if args.camera is not None:
+        stream_camera(args.camera, optimize_order=not args.no_order)
+        return
+    
+    import turtle
+    
+    positions = args.position or []
+    positions += [(0, 0)] * (len(args.images) - len(positions))
+    
+    # Draw each image
+    for image_file, (x, y) in zip(args.images, positions):
+        draw_image(image_file, x, y, fast_preview=not args.turtle,
+                   optimize_order=not args.no_order, strip_height=args.strip_height)
+    
+    turtle.done()
+
+if __name__ == "__main__":
+    main()